@@ -0,0 +1,435 @@
+import os
+import sys
+import csv
+import json
+import time
+import random
+import signal
+import socket
+import platform
+import resource
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from file_client import FileClient
+
+"""
+* benchmark terpadu pengganti stress_test_multithread_pool.py dan
+stress_test_multiprocess_pool.py: menjalankan sendiri setiap mode server
+secara lokal dengan jumlah worker tertentu, lalu menyapu
+operasi x ukuran file x jumlah client x worker server, dan pada mode
+biner juga jumlah segmen (download paralel / upload multipart) x
+kompresi download. --if-changed dan --keep-alive diteruskan ke setiap
+FileClient
+
+* per percobaan dicatat: latensi per operasi (p50/p95/p99, rata-rata,
+maks), throughput, jumlah sukses/gagal di sisi client dan di sisi server
+(dari STATS, hanya untuk mode satu proses), CPU dan RSS proses server
+(dari /proc, termasuk semua proses worker; puncak RSS dilaporkan sebagai
+jumlah dan maksimum per proses) dan CPU/RSS proses client
+
+* hasil ditulis sebagai JSON (plus CSV opsional) beserta metadata
+(commit git, versi Python, jumlah CPU, argumen) dan dapat dibandingkan
+dengan hasil sebelumnya (--baseline): throughput yang turun atau p95
+yang naik melebihi --tolerance dilaporkan sebagai regresi dan exit code
+menjadi 1
+
+* isi file uji dibuat dari --seed sehingga setiap run memakai data yang
+sama persis
+"""
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# mode server -> argumen perintah (pool_size dan --port ditambahkan)
+SERVER_MODES = {
+    'thread': ['file_server_multithread_pool.py'],
+    'process': ['file_server_multiprocess_pool.py'],
+    'prefork': ['file_server_multiprocess_pool.py', '--prefork'],
+    'async': ['file_server_async.py'],
+    'hybrid': ['file_server_hybrid.py'],
+}
+# mode yang seluruh request-nya dilayani satu proses, sehingga STATS
+# mewakili seluruh server
+SINGLE_PROCESS_MODES = {'thread', 'async', 'hybrid'}
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def percentile(values, q):
+    # nearest-rank, cukup untuk jumlah sampel benchmark
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+def latency_summary(latencies):
+    # latensi dalam milidetik
+    ms = [x * 1000 for x in latencies]
+    return dict(p50_ms=round(percentile(ms, 0.50), 2), p95_ms=round(percentile(ms, 0.95), 2),
+                p99_ms=round(percentile(ms, 0.99), 2), mean_ms=round(sum(ms) / len(ms), 2) if ms else 0,
+                max_ms=round(max(ms), 2) if ms else 0)
+
+
+def process_tree(pid):
+    # pid beserta semua turunannya, dari /proc (Linux)
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as fp:
+                ppid = int(fp.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, todo = [], [pid]
+    while todo:
+        current = todo.pop()
+        tree.append(current)
+        todo.extend(children.get(current, []))
+    return tree
+
+
+def process_usage(pid):
+    # (detik CPU, RSS kB, jumlah puncak RSS kB, puncak RSS terbesar kB)
+    # seluruh pohon proses; None jika /proc tidak tersedia. Puncak tiap
+    # proses bisa terjadi pada saat berbeda, jadi jumlahnya hanya batas atas
+    if not os.path.isdir('/proc'):
+        return None
+    cpu, rss, hwm, hwm_max = 0.0, 0, 0, 0
+    for p in process_tree(pid):
+        try:
+            with open(f'/proc/{p}/stat') as fp:
+                fields = fp.read().rsplit(')', 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+            with open(f'/proc/{p}/status') as fp:
+                for line in fp:
+                    if line.startswith('VmRSS:'):
+                        rss += int(line.split()[1])
+                    elif line.startswith('VmHWM:'):
+                        peak = int(line.split()[1])
+                        hwm += peak
+                        hwm_max = max(hwm_max, peak)
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu, rss, hwm, hwm_max
+
+
+class ServerProcess:
+    """
+    server yang dijalankan benchmark di direktori kerja sendiri
+    (<workdir>/files) dan dihentikan dengan SIGINT seperti Ctrl+C
+    """
+    def __init__(self, mode, pool_size, port, workdir, extra_args=()):
+        self.mode = mode
+        self.pool_size = pool_size
+        self.port = port
+        self.workdir = workdir
+        self.command = ([sys.executable, os.path.join(HERE, SERVER_MODES[mode][0])] + SERVER_MODES[mode][1:] +
+                        [str(pool_size), '--port', str(port), '--log-level', 'ERROR'] + list(extra_args))
+        self.process = None
+
+    def start(self, timeout=15):
+        self.log = open(os.path.join(self.workdir, f'server-{self.mode}-{self.pool_size}.log'), 'w')
+        self.process = subprocess.Popen(self.command, cwd=self.workdir, stdout=self.log, stderr=self.log,
+                                        start_new_session=True)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server {self.mode} berhenti, lihat {self.log.name}")
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"server {self.mode} tidak siap dalam {timeout} detik")
+
+    def usage(self):
+        return process_usage(self.process.pid)
+
+    def stats(self):
+        # metrik server (STATS); hanya bermakna untuk mode satu proses
+        if self.mode not in SINGLE_PROCESS_MODES:
+            return None
+        try:
+            hasil = FileClient('127.0.0.1', self.port, 'text').remote_stats()
+            return hasil['data'] if hasil['status'] == 'OK' else None
+        except Exception:
+            return None
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGINT)
+            self.process.wait(15)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+        except ProcessLookupError:
+            pass
+        self.log.close()
+        self.process = None
+
+
+def request_counts(stats, operation):
+    # (request, error) untuk perintah operasi dari snapshot STATS
+    command = dict(download='get', upload='upload')[operation]
+    m = (stats or {}).get('commands', {}).get(command, {})
+    return m.get('requests', 0), m.get('errors', 0)
+
+
+def client_worker(ip, port, operation, path, protocol, requests, client_dir, index=0, segments=1,
+                  compression=None, if_changed=False, keep_alive=False):
+    # satu client: menjalankan `requests` operasi berurutan. Hasilnya list
+    # (sukses, latensi detik, byte) dan puncak RSS proses client (kB).
+    # Setiap client mengunduh ke file tujuan sendiri, dihapus di akhir
+    if os.getcwd() != client_dir:
+        os.chdir(client_dir)
+    client = FileClient(ip, port, protocol, keep_alive=keep_alive, compression=compression)
+    dest = os.path.join(client_dir, f'download-{index}.bin')
+    results = []
+    try:
+        for _ in range(requests):
+            if operation == 'download':
+                results.append(client.remote_get(os.path.basename(path), segments=segments, dest=dest))
+            else:
+                results.append(client.remote_upload(path, parts=segments, if_changed=if_changed))
+    finally:
+        if os.path.exists(dest):
+            os.remove(dest)
+    return results, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def prepare_files(workdir, sizes, seed):
+    # file uji per ukuran, ditulis ulang setiap run agar sama dengan seed:
+    # files/ untuk download (dilayani server), client/ untuk sumber upload
+    paths = {}
+    for directory in ('files', 'client'):
+        os.makedirs(os.path.join(workdir, directory), exist_ok=True)
+    for mb in sizes:
+        rng = random.Random(f"{seed}-{mb}")
+        data = rng.randbytes(mb * 1024 * 1024)
+        download = os.path.join(workdir, 'files', f'bench_{mb}mb.bin')
+        upload = os.path.join(workdir, 'client', f'bench_up_{mb}mb.bin')
+        for path in (download, upload):
+            with open(path, 'wb') as fp:
+                fp.write(data)
+        paths[mb] = dict(download=download, upload=upload)
+    return paths
+
+
+class BenchmarkRunner:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = os.path.abspath(args.workdir)
+        self.client_dir = os.path.join(self.workdir, 'client')
+        self.results = []
+
+    def run(self):
+        paths = prepare_files(self.workdir, self.args.sizes, self.args.seed)
+        configs = [(mode, workers) for mode in self.args.servers for workers in self.args.server_workers]
+        for mode, workers in configs:
+            server = ServerProcess(mode, workers, self.args.port, self.workdir, self.args.server_args)
+            server.start()
+            try:
+                for protocol in self.args.protocols:
+                    for operation in self.args.operations:
+                        for mb in self.args.sizes:
+                            for clients in self.args.clients:
+                                path = paths[mb][operation if operation == 'upload' else 'download']
+                                for variant in self.variants(protocol, operation):
+                                    for _ in range(self.args.warmup):
+                                        self.trial(server, protocol, operation, path, mb, clients, *variant,
+                                                   record=False)
+                                    for repeat in range(self.args.repeat):
+                                        self.trial(server, protocol, operation, path, mb, clients, *variant,
+                                                   repeat=repeat)
+            finally:
+                server.stop()
+        return self.results
+
+    def variants(self, protocol, operation):
+        # (segmen, kompresi) yang disapu; keduanya hanya berlaku di mode
+        # biner dan kompresi hanya untuk download
+        if protocol != 'binary':
+            return [(1, 'none')]
+        compressions = self.args.compression if operation == 'download' else ['none']
+        return [(segments, compression) for segments in self.args.segments for compression in compressions]
+
+    def trial(self, server, protocol, operation, path, mb, clients, segments=1, compression='none', repeat=0,
+              record=True):
+        stats_before = server.stats()
+        usage_before = server.usage()
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self_before = resource.getrusage(resource.RUSAGE_SELF)
+
+        # client proses terpisah agar GIL client tidak ikut terukur
+        executor_class = ProcessPoolExecutor if self.args.client_mode == 'process' else ThreadPoolExecutor
+        start = time.perf_counter()
+        with executor_class(max_workers=clients) as executor:
+            futures = [executor.submit(client_worker, '127.0.0.1', server.port, operation, path, protocol,
+                                       self.args.requests, self.client_dir, index, segments,
+                                       None if compression == 'none' else compression, self.args.if_changed,
+                                       self.args.keep_alive)
+                       for index in range(clients)]
+            outcomes = [f.result() for f in futures]
+        responses = [r for results, _ in outcomes for r in results]
+        elapsed = time.perf_counter() - start
+
+        usage_after = server.usage()
+        stats_after = server.stats()
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self_after = resource.getrusage(resource.RUSAGE_SELF)
+        time.sleep(self.args.cooldown)
+        if not record:
+            return None
+
+        ok = [r for r in responses if r[0]]
+        transferred = sum(r[2] for r in ok)
+        client_cpu = sum(getattr(after, f) - getattr(before, f)
+                         for before, after in ((children_before, children_after), (self_before, self_after))
+                         for f in ('ru_utime', 'ru_stime'))
+        result = dict(
+            server=server.mode, server_workers=server.pool_size, protocol=protocol, operation=operation,
+            size_mb=mb, clients=clients, segments=segments, compression=compression,
+            requests=len(responses), repeat=repeat,
+            duration_s=round(elapsed, 3),
+            throughput_mbps=round(transferred / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0,
+            ops_per_s=round(len(ok) / elapsed, 2) if elapsed > 0 else 0,
+            client_success=len(ok), client_fail=len(responses) - len(ok),
+            **latency_summary([r[1] for r in ok]),
+            client_cpu_s=round(client_cpu, 2),
+            client_peak_rss_mb=round(max(rss for _, rss in outcomes) / 1024, 1),
+        )
+        # segmen, multipart dan --if-changed memakai lebih dari satu perintah
+        # (atau perintah lain) per operasi, jadi hitungan server tidak sebanding
+        one_command = segments == 1 and not (operation == 'upload' and self.args.if_changed)
+        if stats_before is not None and stats_after is not None and one_command:
+            before, after = request_counts(stats_before, operation), request_counts(stats_after, operation)
+            errors = after[1] - before[1]
+            result.update(server_success=after[0] - before[0] - errors, server_fail=errors)
+        else:
+            result.update(server_success=None, server_fail=None)
+        if usage_before is not None and usage_after is not None:
+            result.update(server_cpu_s=round(usage_after[0] - usage_before[0], 2),
+                          server_rss_mb=round(usage_after[1] / 1024, 1),
+                          server_peak_rss_sum_mb=round(usage_after[2] / 1024, 1),
+                          server_peak_rss_max_mb=round(usage_after[3] / 1024, 1))
+        self.results.append(result)
+        self.display(result)
+        return result
+
+    def display(self, r):
+        print(f"{r['server']:<8}{r['server_workers']:>3}w {r['protocol']:<6} {r['operation']:<8} {r['size_mb']:>4}MB "
+              f"{r['clients']:>3}c {r['segments']:>2}s {r['compression']:<4}  {r['throughput_mbps']:>8.2f} MB/s  p50 {r['p50_ms']:>8.1f}  p95 {r['p95_ms']:>8.1f}  "
+              f"p99 {r['p99_ms']:>8.1f} ms  ok {r['client_success']}/{r['requests']}  "
+              f"srv cpu {r.get('server_cpu_s')}s rss {r.get('server_rss_mb')}MB")
+
+
+RESULT_KEY = ('server', 'server_workers', 'protocol', 'operation', 'size_mb', 'clients', 'segments', 'compression')
+# nilai kunci untuk hasil lama yang belum mencatatnya
+RESULT_KEY_DEFAULTS = dict(segments=1, compression='none')
+
+
+def aggregate(results):
+    # median per konfigurasi dari semua pengulangan
+    groups = {}
+    for r in results:
+        groups.setdefault(tuple(r.get(k, RESULT_KEY_DEFAULTS.get(k)) for k in RESULT_KEY), []).append(r)
+    return {key: dict(throughput_mbps=percentile([r['throughput_mbps'] for r in rs], 0.5),
+                      p95_ms=percentile([r['p95_ms'] for r in rs], 0.5))
+            for key, rs in groups.items()}
+
+
+def compare_baseline(results, baseline_results, tolerance):
+    # daftar regresi: throughput turun atau p95 naik lebih dari tolerance
+    current, baseline = aggregate(results), aggregate(baseline_results)
+    regressions = []
+    for key, now in current.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        label = ' '.join(str(k) for k in key)
+        if old['throughput_mbps'] and now['throughput_mbps'] < old['throughput_mbps'] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old['throughput_mbps']} -> {now['throughput_mbps']} MB/s")
+        if old['p95_ms'] and now['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old['p95_ms']} -> {now['p95_ms']} ms")
+    return regressions
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return dict(timestamp=datetime.now().isoformat(), commit=commit or None, python=platform.python_version(),
+                platform=platform.platform(), cpu_count=os.cpu_count(), args=vars(args))
+
+
+def export_csv(results, filename):
+    if not results:
+        return
+    with open(filename, 'w', newline='') as fp:
+        writer = csv.DictWriter(fp, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark file server: menjalankan server lokal dan menyapu parameter")
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVER_MODES), default=["thread", "process"])
+    parser.add_argument("--server-workers", nargs="+", type=int, default=[1, 5])
+    parser.add_argument("--operations", nargs="+", choices=["download", "upload"], default=["download", "upload"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10], help="ukuran file dalam MB")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 5, 20])
+    parser.add_argument("--protocols", nargs="+", choices=["text", "binary"], default=["binary"])
+    parser.add_argument("--segments", nargs="+", type=int, default=[1],
+                        help="jumlah koneksi paralel per download/upload (mode biner), disapu")
+    parser.add_argument("--compression", nargs="+", choices=["none", "auto", "zlib", "zstd", "lz4"], default=["none"],
+                        help="kompresi download (mode biner), disapu")
+    parser.add_argument("--if-changed", action="store_true", help="upload dilewati jika file di server sudah sama (STAT)")
+    parser.add_argument("--keep-alive", action="store_true", help="pakai ulang koneksi antar operasi; pada server pool, koneksi idle tetap memegang worker")
+    parser.add_argument("--requests", type=int, default=1, help="jumlah operasi berurutan per client")
+    parser.add_argument("--client-mode", choices=["process", "thread"], default="process")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="percobaan awal yang tidak dicatat per konfigurasi")
+    parser.add_argument("--cooldown", type=float, default=0.2, help="jeda antar percobaan (detik)")
+    parser.add_argument("--port", type=int, default=7790)
+    parser.add_argument("--workdir", default="bench-work", help="direktori data uji dan files/ server")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-args", nargs=argparse.REMAINDER, default=[],
+                        help="argumen tambahan untuk server, harus di akhir (mis. --server-args --cache-mb 0)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--csv", help="juga tulis hasil sebagai CSV")
+    parser.add_argument("--baseline", help="hasil JSON sebelumnya untuk deteksi regresi")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+    # client mode thread berpindah ke direktori client, path hasil dibuat absolut dulu
+    args.output = os.path.abspath(args.output)
+    args.csv = args.csv and os.path.abspath(args.csv)
+    args.baseline = args.baseline and os.path.abspath(args.baseline)
+
+    results = BenchmarkRunner(args).run()
+    with open(args.output, 'w') as fp:
+        json.dump(dict(metadata=metadata(args), results=results), fp, indent=1)
+    print(f"\nHasil ditulis ke {args.output}")
+    if args.csv:
+        export_csv(results, args.csv)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare_baseline(results, baseline['results'], args.tolerance)
+        print(f"Baseline {args.baseline} (commit {baseline['metadata'].get('commit')}): "
+              f"{len(regressions)} regresi (toleransi {args.tolerance:.0%})")
+        for line in regressions:
+            print(f"  REGRESI {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
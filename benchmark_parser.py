@@ -0,0 +1,49 @@
+import os
+import shlex
+import base64
+import timeit
+import argparse
+
+from file_protocol import FileProtocol
+
+"""
+* membandingkan parsing request mode teks cara lama
+(shlex.split(string.lower()) + getattr) dengan FileProtocol.parse_request
+yang hanya menokenisasi header request
+"""
+
+
+def legacy_parse(fp, string_datamasuk):
+    c = shlex.split(string_datamasuk.lower())
+    c_request = c[0].strip()
+    return getattr(fp.file, c_request), [x for x in c[1:]]
+
+
+def fast_parse(fp, string_datamasuk):
+    c_request, params = fp.parse_request(string_datamasuk)
+    return fp.commands[c_request], params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser request mode teks")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 16, 64],
+                        help="Ukuran isi UPLOAD dalam KB (default: 1 16 64)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fp = FileProtocol()
+    requests = [("LIST", "LIST"), ("GET", "GET pokijan.jpg"), ("DELETE", 'DELETE "nama file.txt"')]
+    for kb in args.sizes:
+        content = base64.b64encode(os.urandom(kb * 1024)).decode()
+        requests.append((f"UPLOAD {kb} KB", f"UPLOAD random.bin {content}"))
+
+    print(f"{'Request':<16}{'shlex (ms)':>14}{'parser (ms)':>14}{'speedup':>10}")
+    for label, string_datamasuk in requests:
+        number = max(1, 2000 // (len(string_datamasuk) // 1024 + 1))
+        legacy = min(timeit.repeat(lambda: legacy_parse(fp, string_datamasuk), number=number, repeat=args.repeat)) / number
+        fast = min(timeit.repeat(lambda: fast_parse(fp, string_datamasuk), number=number, repeat=args.repeat)) / number
+        print(f"{label:<16}{legacy * 1000:>14.4f}{fast * 1000:>14.4f}{legacy / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,629 @@
+import socket
+import select
+import json
+import base64
+import logging
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from file_protocol import MessageReader, frame_prefix
+from file_interface import CHUNK_SIZE
+from file_storage import file_digest
+from file_compression import CODECS
+
+
+class ConnectionPool:
+    """
+    koneksi idle yang disimpan per alamat server agar request berikutnya
+    tidak perlu membuka koneksi TCP baru
+    """
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, address):
+        while True:
+            with self.lock:
+                conns = self.idle.get(address)
+                if not conns:
+                    return None
+                conn = conns.pop()
+            if not stale(conn):
+                return conn
+            conn.close()
+
+    def release(self, address, conn):
+        with self.lock:
+            conns = self.idle.setdefault(address, [])
+            if len(conns) < self.max_idle:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            conns = [c for idle in self.idle.values() for c in idle]
+            self.idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+def stale(conn):
+    # koneksi idle seharusnya tidak bisa dibaca; jika bisa, server sudah
+    # menutupnya (EOF) atau mengirim sesuatu yang tidak diminta
+    if len(conn):
+        return True
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+connection_pool = ConnectionPool()
+
+# perintah yang tidak mengubah apa pun di server, sehingga aman dikirim
+# ulang otomatis jika koneksi keep-alive ternyata putus
+RETRY_SAFE = frozenset(('LIST', 'GET', 'STAT', 'STATS', 'MGET'))
+
+
+def retry_safe(command):
+    return command.strip().split(' ', 1)[0].upper() in RETRY_SAFE
+
+# hash file lokal per (path, inode, ukuran, mtime) agar file yang sama tidak
+# di-hash ulang setiap kali diupload
+local_digests = {}
+local_digests_lock = threading.Lock()
+
+
+def local_digest(path):
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns)
+    with local_digests_lock:
+        digest = local_digests.get(key)
+    if digest is None:
+        digest = file_digest(path)
+        with local_digests_lock:
+            local_digests[key] = digest
+    return digest
+
+
+def file_version(hasil):
+    # identitas isi file di server dari balasan GET; berubah jika file ditimpa
+    return [hasil.get('data_size'), hasil.get('data_mtime_ns')]
+
+
+def save_version(path, hasil):
+    # dicatat sebelum payload ditulis, dihapus setelah unduhan lengkap;
+    # resume hanya dilakukan jika catatan ini ada dan masih cocok
+    with open(f"{path}.resume", 'w') as fp:
+        json.dump(file_version(hasil), fp)
+
+
+def load_version(path):
+    try:
+        with open(f"{path}.resume") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_version(path):
+    try:
+        os.remove(f"{path}.resume")
+    except FileNotFoundError:
+        pass
+
+
+def quote(name):
+    # nama file dengan spasi dikutip agar tetap satu parameter mode teks
+    return f'"{name}"' if ' ' in name else name
+
+
+class PositionalWriter:
+    """
+    objek mirip file untuk MessageReader.read_into_file yang menulis ke
+    posisi tertentu dengan os.pwrite, sehingga beberapa thread bisa
+    mengisi bagian berbeda dari file yang sama tanpa seek bersama
+    """
+    def __init__(self, fd, offset):
+        self.fd = fd
+        self.offset = offset
+
+    def write(self, data):
+        with memoryview(data) as view:
+            while view:
+                n = os.pwrite(self.fd, view, self.offset)
+                self.offset += n
+                view = view[n:]
+
+
+class FileClient:
+    def __init__(self, ip, port, protocol="text", keep_alive=False, pool=None, compression=None):
+        self.server_address = (ip, port)
+        self.timeout = 300
+        # "text" untuk protokol JSON/base64 lama, "binary" untuk frame biner
+        self.protocol = protocol
+        # keep_alive: koneksi dikembalikan ke pool setelah balasan lengkap
+        self.keep_alive = keep_alive
+        self.pool = pool or connection_pool
+        # kompresi GET mode biner: None, nama encoding, atau "auto" (semua
+        # encoding yang tersedia, server memilih)
+        if compression == "auto":
+            self.accept_encoding = list(CODECS)
+        else:
+            self.accept_encoding = [compression] if compression else []
+
+    def connect(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.server_address)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def call(self, fn, retry=True):
+        # jalankan fn(conn) pada koneksi dari pool (atau koneksi baru);
+        # koneksi lama yang ternyata sudah ditutup server dicoba ulang
+        # sekali dengan koneksi baru, hanya jika retry (request tidak
+        # mengubah apa pun di server). Request lain bisa saja sudah
+        # diproses server sebelum koneksi putus, jadi tidak dikirim ulang
+        conn = self.pool.acquire(self.server_address) if self.keep_alive else None
+        reused = conn is not None
+        while True:
+            if conn is None:
+                conn = MessageReader(self.connect())
+            try:
+                result = fn(conn)
+            except Exception:
+                conn.close()
+                if not reused or not retry:
+                    raise
+                conn, reused = None, False
+                continue
+            if self.keep_alive:
+                self.pool.release(self.server_address, conn)
+            else:
+                conn.close()
+            return result
+
+    def send_command(self, command_str=""):
+        def request(conn):
+            conn.sock.sendall((command_str + "\r\n\r\n").encode())
+            return json.loads(self.recv_message(conn))
+        try:
+            return self.call(request, retry=retry_safe(command_str))
+        except Exception as e:
+            return {"status": "ERROR", "data": str(e)}
+
+    def recv_message(self, conn):
+        message = conn.read_until(b"\r\n\r\n")
+        if message is None:
+            raise ConnectionError("koneksi ditutup server")
+        return message.decode()
+
+    def frame_header(self, command, params=None):
+        header = dict(command=command, params=list(params or []))
+        if self.accept_encoding and command.upper() == "GET":
+            header['accept_encoding'] = self.accept_encoding
+        return header
+
+    def request_frame(self, conn, command, params=None, payload=b""):
+        # kirim satu frame request lalu baca header balasannya; payload
+        # balasan dibiarkan di socket agar pemanggil bisa membacanya bertahap
+        conn.sock.sendall(frame_prefix(self.frame_header(command, params), len(payload)))
+        if payload:
+            conn.sock.sendall(payload)
+        return conn.read_frame_header()
+
+    def read_payload(self, conn, hasil, payload_len):
+        # payload balasan utuh, sudah didekompresi jika perlu
+        data = conn.read_payload(payload_len)
+        if hasil.get('data_encoding'):
+            decompressor = CODECS[hasil['data_encoding']].decompressor()
+            data = decompressor.decompress(data) + decompressor.flush()
+        return data
+
+    def write_payload(self, conn, hasil, payload_len, fp):
+        # payload balasan ditulis ke fp per potongan, didekompresi jika perlu
+        if not hasil.get('data_encoding'):
+            conn.read_into_file(fp, payload_len)
+            return
+        decompressor = CODECS[hasil['data_encoding']].decompressor()
+        for piece in conn.iter_payload(payload_len):
+            fp.write(decompressor.decompress(piece))
+        fp.write(decompressor.flush())
+
+    def send_frame(self, command, params=None, payload=b""):
+        def request(conn):
+            hasil, payload_len = self.request_frame(conn, command, params, payload)
+            return hasil, self.read_payload(conn, hasil, payload_len)
+        try:
+            return self.call(request, retry=retry_safe(command))
+        except Exception as e:
+            return {"status": "ERROR", "data": str(e)}, b""
+
+    def pipeline(self, commands):
+        # kirim beberapa request sekaligus pada satu koneksi lalu baca
+        # balasannya berurutan. Mode teks: commands berisi string perintah,
+        # hasilnya list dict. Mode biner: commands berisi pasangan
+        # (command, params), hasilnya list (dict, payload)
+        def request(conn):
+            if self.protocol == "binary":
+                frames = [frame_prefix(self.frame_header(c, p)) for c, p in commands]
+                conn.sock.sendall(b"".join(frames))
+                results = []
+                for _ in commands:
+                    hasil, payload_len = conn.read_frame_header()
+                    results.append((hasil, self.read_payload(conn, hasil, payload_len)))
+                return results
+            conn.sock.sendall("".join(c + "\r\n\r\n" for c in commands).encode())
+            return [json.loads(self.recv_message(conn)) for _ in commands]
+        names = [c if self.protocol != "binary" else c[0] for c in commands]
+        try:
+            return self.call(request, retry=all(retry_safe(name) for name in names))
+        except Exception as e:
+            logging.error(f"Pipeline failed: {e}")
+            return None
+
+    def remote_list(self):
+        if self.protocol == "binary":
+            hasil, _ = self.send_frame("LIST")
+        else:
+            hasil = self.send_command("LIST")
+        if hasil['status'] == 'OK':
+            return True, hasil['data']
+        return False, hasil.get("data", "Unknown error")
+
+    def remote_mget(self, filenames, batch=100):
+        # unduh banyak file kecil dengan MGET, batch file per request;
+        # hasilnya (semua berhasil, waktu, total byte)
+        start = time.time()
+        ok_all, total = True, 0
+        for i in range(0, len(filenames), batch):
+            ok, size = self.mget_batch(filenames[i:i + batch])
+            ok_all, total = ok_all and ok, total + size
+        return ok_all, time.time() - start, total
+
+    def mget_batch(self, filenames):
+        if self.protocol != "binary":
+            hasil = self.send_command("MGET " + " ".join(quote(f) for f in filenames))
+            if hasil['status'] != 'OK':
+                return False, 0
+            ok, total = True, 0
+            for item in hasil['data']:
+                if item['status'] != 'OK':
+                    ok = False
+                    continue
+                isifile = base64.b64decode(item['data_file'])
+                with open(item['data_namafile'], 'wb') as fp:
+                    fp.write(isifile)
+                total += len(isifile)
+            return ok, total
+
+        def request(conn):
+            hasil, payload_len = self.request_frame(conn, "MGET", filenames)
+            if hasil['status'] != 'OK':
+                conn.read_payload(payload_len)
+                return False, 0
+            ok, total = True, 0
+            for item in hasil['data_files']:
+                if item['status'] != 'OK':
+                    ok = False
+                    continue
+                with open(item['data_namafile'], 'wb') as fp:
+                    conn.read_into_file(fp, item['data_length'])
+                total += item['data_length']
+            return ok, total
+        try:
+            return self.call(request)
+        except Exception as e:
+            logging.error(f"MGET failed: {e}")
+            return False, 0
+
+    def remote_mdelete(self, filenames, batch=100):
+        # hasilnya (semua berhasil, list status per file)
+        results = []
+        for i in range(0, len(filenames), batch):
+            names = filenames[i:i + batch]
+            if self.protocol == "binary":
+                hasil, _ = self.send_frame("MDELETE", names)
+            else:
+                hasil = self.send_command("MDELETE " + " ".join(quote(f) for f in names))
+            if hasil['status'] != 'OK':
+                results.extend(dict(status='ERROR', data_namafile=f, data=hasil.get('data')) for f in names)
+                continue
+            results.extend(hasil['data'])
+        return all(r['status'] == 'OK' for r in results), results
+
+    def remote_get(self, filename="", resume=False, retries=0, segments=1, dest=None):
+        # resume: lanjutkan file lokal yang belum lengkap dengan GET sebagian
+        # mulai dari ukuran file lokal. retries: jumlah percobaan ulang jika
+        # transfer gagal; percobaan ulang selalu melanjutkan (resume).
+        # segments > 1: unduh paralel lewat beberapa koneksi (mode biner).
+        # dest: path file lokal, default nama file di direktori kerja
+        if segments > 1 and self.protocol == "binary":
+            return self.remote_get_segmented(filename, dest=dest, segments=segments, retries=retries)
+        start = time.time()
+        received = 0
+        for attempt in range(retries + 1):
+            if self.protocol == "binary":
+                ok, _, size = self.remote_get_stream(filename, dest=dest, resume=resume or attempt > 0)
+            else:
+                ok, _, size = self.remote_get_text(filename, dest=dest, resume=resume or attempt > 0)
+            received += size
+            if ok:
+                return True, time.time() - start, received
+        return False, 0, 0
+
+    def resume_offset(self, path, resume):
+        # (offset lanjutan, versi file server saat unduhan dimulai); tanpa
+        # catatan versi file lokal tidak bisa dipastikan berasal dari file
+        # yang sama, jadi unduhan diulang dari awal
+        if resume and os.path.exists(path):
+            version = load_version(path)
+            if version is not None:
+                return os.path.getsize(path), version
+        return 0, None
+
+    def remote_get_text(self, filename="", dest=None, resume=False):
+        start = time.time()
+        offset, version = self.resume_offset(dest or filename, resume)
+        hasil = self.send_command(f"GET {filename} {offset}") if offset else None
+        if hasil is None or hasil['status'] != 'OK' or file_version(hasil) != version:
+            # file di server berubah sejak unduhan dimulai, atau lebih kecil
+            # dari file lokal: unduh ulang utuh
+            offset = 0
+            hasil = self.send_command(f"GET {filename}")
+        if hasil['status'] == 'OK':
+            try:
+                namafile = dest or hasil['data_namafile']
+                isifile = base64.b64decode(hasil['data_file'])
+                if not offset and len(isifile) > CHUNK_SIZE:
+                    save_version(namafile, hasil)
+                with open(namafile, 'r+b' if offset else 'wb+') as fp:
+                    fp.seek(offset)
+                    fp.write(isifile)
+                    fp.truncate()
+                clear_version(namafile)
+                return True, time.time() - start, len(isifile)
+            except Exception as e:
+                logging.error(f"Download failed for {filename}: {e}")
+                return False, 0, 0
+        else:
+            return False, 0, 0
+
+    def remote_get_stream(self, filename="", dest=None, resume=False):
+        # GET mode biner: payload ditulis langsung ke disk per potongan,
+        # memori yang dipakai tidak lebih dari CHUNK_SIZE. Dengan resume,
+        # hanya byte setelah akhir file lokal yang diminta
+        start = time.time()
+        received = 0
+
+        def request(conn):
+            nonlocal received
+            path = dest or filename
+            offset, version = self.resume_offset(path, resume)
+            if offset:
+                # GET range kosong untuk memeriksa file di server masih sama
+                # dengan saat unduhan dimulai, tanpa menerima isi file
+                probe, payload_len = self.request_frame(conn, "GET", [filename, offset, 0])
+                conn.read_payload(payload_len)
+                if probe['status'] != 'OK' or file_version(probe) != version:
+                    offset = 0
+            hasil, payload_len = self.request_frame(conn, "GET", [filename, offset] if offset else [filename])
+            if hasil['status'] != 'OK':
+                conn.read_payload(payload_len)
+                return False, 0, 0
+            if offset and file_version(hasil) != version:
+                # file ditimpa di antara dua request: koneksi ditutup, catatan
+                # versi lama membuat percobaan berikutnya mulai dari awal
+                raise ValueError(f"File {filename} berubah saat unduhan dilanjutkan")
+            if not offset and hasil['data_length'] > CHUNK_SIZE:
+                save_version(path, hasil)
+            with open(path, 'r+b' if offset else 'wb') as fp:
+                fp.seek(offset)
+                fp.truncate()
+                # byte yang sudah diterima tetap tersimpan jika koneksi putus
+                # di tengah jalan, sehingga percobaan berikutnya bisa resume
+                before = fp.tell()
+                try:
+                    self.write_payload(conn, hasil, payload_len, fp)
+                finally:
+                    received += fp.tell() - before
+            clear_version(path)
+            return True, time.time() - start, hasil['data_length']
+        try:
+            return self.call(request)
+        except Exception as e:
+            logging.error(f"Download failed for {filename}: {e}")
+            return False, 0, received
+
+    def remote_get_segmented(self, filename="", dest=None, segments=4, retries=0):
+        # file dibagi menjadi beberapa segmen yang diunduh bersamaan, masing-
+        # masing dengan GET sebagian di koneksinya sendiri, lalu ditulis
+        # langsung ke posisinya di file tujuan yang sudah dialokasikan
+        start = time.time()
+        path = dest or filename
+        hasil, _ = self.send_frame("GET", [filename, 0, 0])
+        if hasil['status'] != 'OK':
+            return False, 0, 0
+        size = hasil['data_size']
+        segment_size = max(CHUNK_SIZE, -(-size // segments))
+        ranges = [(offset, min(segment_size, size - offset)) for offset in range(0, size, segment_size)]
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if size and hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+            with ThreadPoolExecutor(max_workers=max(1, len(ranges))) as executor:
+                done = list(executor.map(lambda r: self.get_segment(filename, fd, *r, retries=retries,
+                                                                    version=file_version(hasil)), ranges))
+        finally:
+            os.close(fd)
+        if not all(done):
+            return False, 0, 0
+        return True, time.time() - start, size
+
+    def get_segment(self, filename, fd, offset, length, retries=0, version=None):
+        # satu segmen; jika koneksi putus, percobaan berikutnya hanya
+        # meminta sisa segmen yang belum tertulis. version: file_version
+        # dari request pertama, segmen dari file yang sudah ditimpa ditolak
+        writer = PositionalWriter(fd, offset)
+
+        def request(conn):
+            received = writer.offset - offset
+            hasil, payload_len = self.request_frame(conn, "GET", [filename, writer.offset, length - received])
+            if hasil['status'] != 'OK' or hasil['data_length'] != length - received:
+                conn.read_payload(payload_len)
+                raise ValueError(hasil.get('data', 'ukuran file berubah'))
+            if version is not None and file_version(hasil) != version:
+                # payload tidak dibaca, koneksi ditutup oleh call()
+                raise ValueError(f"File {filename} berubah selama unduhan")
+            self.write_payload(conn, hasil, payload_len, writer)
+        for attempt in range(retries + 1):
+            try:
+                self.call(request)
+                return True
+            except Exception as e:
+                logging.error(f"Segment {offset}+{length} of {filename} failed: {e}")
+        return False
+
+    def remote_stat(self, filename=""):
+        if self.protocol == "binary":
+            hasil, _ = self.send_frame("STAT", [filename])
+        else:
+            hasil = self.send_command(f"STAT {filename}")
+        return hasil
+
+    def remote_stats(self):
+        # metrik server (per proses worker pada server multiprocess)
+        if self.protocol == "binary":
+            hasil, _ = self.send_frame("STATS", [])
+        else:
+            hasil = self.send_command("STATS")
+        return hasil
+
+    def remote_profile(self, mode=None, seconds=None):
+        # tanpa mode: ringkasan span; mode cprofile/sample: mulai window profil
+        params = [p for p in (mode, seconds) if p is not None]
+        if self.protocol == "binary":
+            hasil, _ = self.send_frame("PROFILE", [str(p) for p in params])
+        else:
+            hasil = self.send_command(" ".join(["PROFILE"] + [str(p) for p in params]))
+        return hasil
+
+    def unchanged(self, filepath):
+        # True jika file di server sudah sama persis (ukuran dan SHA-256)
+        hasil = self.remote_stat(os.path.basename(filepath))
+        if hasil['status'] != 'OK' or hasil['data_size'] != os.path.getsize(filepath):
+            return False
+        return hasil['data_sha256'] == local_digest(filepath)
+
+    def remote_upload(self, filepath="", parts=1, retries=0, if_changed=False):
+        # parts > 1: upload multipart paralel lewat beberapa koneksi (mode biner).
+        # if_changed: tanya STAT dulu dan lewati transfer jika isi file di
+        # server sudah sama; byte yang terkirim dilaporkan 0
+        if if_changed and os.path.exists(filepath):
+            start = time.time()
+            if self.unchanged(filepath):
+                return True, time.time() - start, 0
+        if self.protocol == "binary" and parts > 1:
+            return self.remote_upload_multipart(filepath, parts=parts, retries=retries)
+        if self.protocol == "binary":
+            return self.remote_upload_stream(filepath)
+        start = time.time()
+        if not os.path.exists(filepath):
+            return False, 0, 0
+        try:
+            with open(filepath, 'rb') as fp:
+                file_bytes = fp.read()
+            file_content = base64.b64encode(file_bytes).decode()
+            base_filename = os.path.basename(filepath)
+            hasil = self.send_command(f"UPLOAD {base_filename} {file_content}")
+            if hasil['status'] == 'OK':
+                size = os.path.getsize(filepath)
+                return True, time.time() - start, size
+            else:
+                return False, 0, 0
+        except Exception as e:
+            logging.error(f"Upload failed for {filepath}: {e}")
+            return False, 0, 0
+
+    def remote_upload_stream(self, filepath=""):
+        # UPLOAD mode biner: isi file dibaca dan dikirim per potongan
+        start = time.time()
+        if not os.path.exists(filepath):
+            return False, 0, 0
+
+        def request(conn):
+            size = os.path.getsize(filepath)
+            header = dict(command="UPLOAD", params=[os.path.basename(filepath)])
+            conn.sock.sendall(frame_prefix(header, size))
+            with open(filepath, 'rb') as fp:
+                while True:
+                    chunk = fp.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    conn.sock.sendall(chunk)
+            hasil, payload_len = conn.read_frame_header()
+            conn.read_exact(payload_len)
+            if hasil['status'] == 'OK':
+                return True, time.time() - start, size
+            return False, 0, 0
+        try:
+            return self.call(request, retry=False)
+        except Exception as e:
+            logging.error(f"Upload failed for {filepath}: {e}")
+            return False, 0, 0
+
+    def remote_upload_multipart(self, filepath="", parts=4, retries=0):
+        # UPLOAD_INIT, lalu part-part dikirim bersamaan dengan UPLOAD_PART
+        # di koneksi masing-masing, lalu UPLOAD_COMMIT (atau UPLOAD_ABORT
+        # jika ada part yang tetap gagal)
+        start = time.time()
+        if not os.path.exists(filepath):
+            return False, 0, 0
+        size = os.path.getsize(filepath)
+        hasil, _ = self.send_frame("UPLOAD_INIT", [os.path.basename(filepath), size])
+        if hasil['status'] != 'OK':
+            logging.error(f"Upload failed for {filepath}: {hasil.get('data')}")
+            return False, 0, 0
+        upload_id = hasil['data_upload_id']
+        part_size = max(CHUNK_SIZE, -(-size // parts))
+        ranges = [(offset, min(part_size, size - offset)) for offset in range(0, size, part_size)]
+
+        with ThreadPoolExecutor(max_workers=max(1, len(ranges))) as executor:
+            done = list(executor.map(lambda r: self.put_part(filepath, upload_id, *r, retries=retries), ranges))
+        if all(done):
+            hasil, _ = self.send_frame("UPLOAD_COMMIT", [upload_id])
+            if hasil['status'] == 'OK':
+                return True, time.time() - start, size
+            logging.error(f"Upload failed for {filepath}: {hasil.get('data')}")
+        self.send_frame("UPLOAD_ABORT", [upload_id])
+        return False, 0, 0
+
+    def put_part(self, filepath, upload_id, offset, length, retries=0):
+        def request(conn):
+            header = dict(command="UPLOAD_PART", params=[upload_id, offset])
+            conn.sock.sendall(frame_prefix(header, length))
+            with open(filepath, 'rb') as fp:
+                conn.sock.sendfile(fp, offset, length)
+            hasil, payload_len = conn.read_frame_header()
+            conn.read_exact(payload_len)
+            if hasil['status'] != 'OK':
+                raise ValueError(hasil.get('data'))
+        for attempt in range(retries + 1):
+            try:
+                self.call(request, retry=False)
+                return True
+            except Exception as e:
+                logging.error(f"Part {offset}+{length} of {filepath} failed: {e}")
+        return False
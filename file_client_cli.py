@@ -4,6 +4,8 @@ import base64
 import logging
 import os
 
+from file_protocol import MessageReader
+
 server_address=('0.0.0.0',7777)
 
 def send_command(command_str=""):
@@ -14,20 +16,11 @@ def send_command(command_str=""):
     try:
         logging.warning(f"sending message ")
         sock.sendall(command_str.encode())
-        # Look for the response, waiting until socket is done (no more data)
-        data_received="" #empty string
-        while True:
-            #socket does not receive all data at once, data comes in part, need to be concatenated at the end of process
-            data = sock.recv(16)
-            if data:
-                #data is not empty, concat with previous content
-                data_received += data.decode()
-                if "\r\n\r\n" in data_received:
-                    break
-            else:
-                # no more data, stop the process by break
-                break
-        # at this point, data_received (string) will contain all data coming from the socket
+        # Look for the response, waiting until "\r\n\r\n" arrives
+        # socket does not receive all data at once, MessageReader collects the parts
+        # and only scans the newly received tail for the delimiter
+        data_received = MessageReader(sock).read_until().decode()
+        # at this point, data_received (string) will contain the whole response
         # to be able to use the data_received as a dict, need to load it using json.loads()
         hasil = json.loads(data_received)
         logging.warning("data received from server:")
@@ -86,15 +79,7 @@ def remote_upload(filename=""):
         command = f"UPLOAD {base_filename} {file_content}"
         sock.sendall(command.encode())
         
-        data_received = ""
-        while True:
-            data = sock.recv(16)
-            if data:
-                data_received += data.decode()
-                if "\r\n\r\n" in data_received:
-                    break
-            else:
-                break
+        data_received = MessageReader(sock).read_until().decode()
         
         sock.close()
         
@@ -1,101 +1,31 @@
-import socket
-import json
-import base64
 import logging
 import os
 import time
 import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-class FileClient:
-    def __init__(self, ip, port):
-        self.server_address = (ip, port)
-        self.timeout = 300
+from file_client import FileClient
 
-    def send_command(self, command_str=""):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(self.timeout)
-        try:
-            sock.connect(self.server_address)
-            sock.sendall((command_str + "\r\n\r\n").encode())
-            data_received = ""
-            while True:
-                data = sock.recv(1024 * 1024)
-                if data:
-                    data_received += data.decode()
-                    if "\r\n\r\n" in data_received:
-                        break
-                else:
-                    break
-            hasil = json.loads(data_received.split("\r\n\r\n")[0])
-            return hasil
-        except Exception as e:
-            return {"status": "ERROR", "data": str(e)}
-        finally:
-            sock.close()
-
-    def remote_list(self):
-        hasil = self.send_command("LIST")
-        if hasil['status'] == 'OK':
-            return True, hasil['data']
-        return False, hasil.get("data", "Unknown error")
-
-    def remote_get(self, filename=""):
-        start = time.time()
-        hasil = self.send_command(f"GET {filename}")
-        if hasil['status'] == 'OK':
-            try:
-                namafile = hasil['data_namafile']
-                isifile = base64.b64decode(hasil['data_file'])
-                with open(namafile, 'wb+') as fp:
-                    fp.write(isifile)
-                size = os.path.getsize(namafile)
-                return True, time.time() - start, size
-            except Exception as e:
-                logging.error(f"Download failed for {filename}: {e}")
-                return False, 0, 0
-        else:
-            return False, 0, 0
-
-    def remote_upload(self, filepath=""):
-        start = time.time()
-        if not os.path.exists(filepath):
-            return False, 0, 0
-        try:
-            with open(filepath, 'rb') as fp:
-                file_bytes = fp.read()
-            file_content = base64.b64encode(file_bytes).decode()
-            base_filename = os.path.basename(filepath)
-            hasil = self.send_command(f"UPLOAD {base_filename} {file_content}")
-            if hasil['status'] == 'OK':
-                size = os.path.getsize(filepath)
-                return True, time.time() - start, size
-            else:
-                return False, 0, 0
-        except Exception as e:
-            logging.error(f"Upload failed for {filepath}: {e}")
-            return False, 0, 0
-
-def execute_task(ip, port, operation, filename=None):
-    client = FileClient(ip, port)
+def execute_task(ip, port, operation, filename=None, protocol="text", keep_alive=False, retries=0, segments=1, if_changed=False, compression=None):
+    client = FileClient(ip, port, protocol, keep_alive, compression=compression)
     if operation == "download":
-        return client.remote_get(filename)
+        return client.remote_get(filename, retries=retries, segments=segments)
     elif operation == "upload":
-        return client.remote_upload(filename)
+        return client.remote_upload(filename, parts=segments, retries=retries, if_changed=if_changed)
     elif operation == "list":
         status, _ = client.remote_list()
         return status, 0, 0
     else:
         return False, 0, 0
 
-def run_stress_test(ip, port, operation, filename, num_workers):
+def run_stress_test(ip, port, operation, filename, num_workers, protocol="text", keep_alive=False, retries=0, segments=1, if_changed=False, compression=None):
     tasks = [(operation, filename) for _ in range(num_workers)]
     
     start_time = time.time()
     results = []
 
     with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        futures = [executor.submit(execute_task, ip, port, op, fname) for op, fname in tasks]
+        futures = [executor.submit(execute_task, ip, port, op, fname, protocol, keep_alive, retries, segments, if_changed, compression) for op, fname in tasks]
         for future in as_completed(futures):
             results.append(future.result())
 
@@ -134,6 +64,12 @@ def main():
     parser.add_argument("--operation", choices=["download", "upload", "list"], required=True)
     parser.add_argument("--filename", help="Required for upload/download")
     parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--protocol", choices=["text", "binary"], default="text")
+    parser.add_argument("--keep-alive", action="store_true", help="pakai ulang koneksi antar request")
+    parser.add_argument("--retries", type=int, default=0, help="percobaan ulang download yang gagal, melanjutkan dari byte terakhir")
+    parser.add_argument("--segments", type=int, default=1, help="jumlah koneksi paralel per download/upload (mode biner)")
+    parser.add_argument("--if-changed", action="store_true", help="upload dilewati jika file di server sudah sama (STAT)")
+    parser.add_argument("--compression", choices=["auto", "zlib", "zstd", "lz4"], help="kompresi download (mode biner)")
     args = parser.parse_args()
 
     if args.operation in ["download", "upload"] and not args.filename:
@@ -142,7 +78,7 @@ def main():
 
     logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
 
-    result = run_stress_test(args.server_ip, args.server_port, args.operation, args.filename, args.workers)
+    result = run_stress_test(args.server_ip, args.server_port, args.operation, args.filename, args.workers, args.protocol, args.keep_alive, args.retries, args.segments, args.if_changed, args.compression)
     print_summary(result)
 
 if __name__ == "__main__":
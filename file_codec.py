@@ -0,0 +1,209 @@
+import os
+import base64
+import signal
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from file_storage import file_digest
+from file_compression import CODECS
+
+"""
+* kerja CPU berat milik FileInterface (base64 mode teks, hash SHA-256
+untuk STAT, kompresi file utuh) dijalankan lewat objek codec:
+  - b64encode(data) -> str, b64decode(teks) -> bytes
+  - digest(nama)    -> hash SHA-256 isi file (hex)
+  - compress(codec, data) -> bytes, codec dari file_compression
+
+* LocalCodec menjalankannya langsung di thread pemanggil (perilaku lama).
+ProcessCodec mengirimnya ke process pool sehingga thread I/O tidak
+berebut GIL dengan kerja CPU: input disalin sekali ke shared memory,
+worker membacanya dari sana dan menulis hasil ke blok shared memory
+kedua, sehingga data besar tidak di-pickle lewat pipe. Data kecil tetap
+dikerjakan di tempat karena ongkos IPC lebih besar dari kerjanya
+
+* jika worker mati (OOM killer, sinyal), pool yang rusak dibuat ulang dan
+pekerjaan dicoba sekali lagi; jika masih gagal dikerjakan di tempat
+"""
+
+# di bawah ukuran ini kerja CPU dijalankan di thread pemanggil
+CODEC_MIN_BYTES = 256 * 1024
+
+
+class LocalCodec:
+    def b64encode(self, data):
+        return base64.b64encode(data).decode()
+
+    def b64decode(self, text):
+        return base64.b64decode(text)
+
+    def digest(self, filename):
+        return file_digest(filename)
+
+    def compress(self, codec, data):
+        return codec.compress(data)
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return dict(codec='local')
+
+
+def init_worker():
+    # Ctrl+C ke seluruh process group ditangani server, worker codec
+    # dihentikan lewat pool.shutdown(). SIGUSR1/SIGUSR2 (window profil)
+    # juga diabaikan: aksi default-nya mematikan proses, padahal worker
+    # hasil spawn tidak memasang handler profiler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
+
+def buffer_job(op, in_name, in_len, out_name, out_size, codec_name=None):
+    # dijalankan di worker: input dibaca dari shared memory pemanggil, hasil
+    # ditulis ke blok output. Hasil yang tidak muat dikembalikan sebagai bytes
+    src = shared_memory.SharedMemory(name=in_name)
+    try:
+        with src.buf[:in_len] as data:
+            if op == 'b64encode':
+                result = base64.b64encode(data)
+            elif op == 'b64decode':
+                result = base64.b64decode(data)
+            else:
+                result = CODECS[codec_name].compress(data)
+    finally:
+        src.close()
+    if len(result) > out_size:
+        return result
+    dst = shared_memory.SharedMemory(name=out_name)
+    try:
+        dst.buf[:len(result)] = result
+    finally:
+        dst.close()
+    return len(result)
+
+
+class ProcessCodec:
+    """
+    codec yang mengirim kerja CPU ke process pool. Worker dibuat dengan
+    start method "spawn" agar tidak mewarisi lock milik thread server
+    (fork dari proses yang sudah punya banyak thread rawan deadlock)
+    """
+    def __init__(self, workers=None, min_bytes=CODEC_MIN_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_bytes = min_bytes
+        self.local = LocalCodec()
+        self.pool = self.new_pool()
+        self.pool_lock = threading.Lock()
+        self.offloaded = 0
+        self.offloaded_bytes = 0
+        self.inline = 0
+        self.restarts = 0
+        self.fallbacks = 0
+        self.lock = threading.Lock()
+
+    def new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=init_worker)
+
+    def restart(self, broken):
+        # beberapa thread bisa mendapati pool yang sama rusak, hanya yang
+        # pertama yang menggantinya
+        with self.pool_lock:
+            if self.pool is not broken:
+                return
+            broken.shutdown(wait=False)
+            self.pool = self.new_pool()
+        with self.lock:
+            self.restarts += 1
+
+    def submit(self, fn, *args):
+        # dicoba sekali lagi di pool baru; BrokenProcessPool kedua diteruskan
+        # ke pemanggil yang lalu mengerjakannya di tempat
+        pool = self.pool
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            self.restart(pool)
+        return self.pool.submit(fn, *args).result()
+
+    def fallback(self):
+        with self.lock:
+            self.fallbacks += 1
+
+    def offload(self, size):
+        with self.lock:
+            if size < self.min_bytes:
+                self.inline += 1
+                return False
+            self.offloaded += 1
+            self.offloaded_bytes += size
+            return True
+
+    def run(self, op, data, out_size, codec_name=None):
+        # thread pemanggil menunggu future tanpa memegang GIL
+        src = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        dst = shared_memory.SharedMemory(create=True, size=max(out_size, 1))
+        try:
+            src.buf[:len(data)] = data
+            result = self.submit(buffer_job, op, src.name, len(data), dst.name, out_size, codec_name)
+            if isinstance(result, int):
+                return bytes(dst.buf[:result])
+            return result
+        finally:
+            for shm in (src, dst):
+                shm.close()
+                shm.unlink()
+
+    def b64encode(self, data):
+        if not self.offload(len(data)):
+            return self.local.b64encode(data)
+        try:
+            return self.run('b64encode', data, 4 * ((len(data) + 2) // 3)).decode()
+        except BrokenProcessPool:
+            self.fallback()
+            return self.local.b64encode(data)
+
+    def b64decode(self, text):
+        if not self.offload(len(text)):
+            return self.local.b64decode(text)
+        data = text.encode('ascii') if isinstance(text, str) else text
+        try:
+            return self.run('b64decode', data, len(data) * 3 // 4 + 3)
+        except BrokenProcessPool:
+            self.fallback()
+            return self.local.b64decode(text)
+
+    def digest(self, filename):
+        # worker membaca file sendiri, isi file tidak perlu disalin
+        if not self.offload(os.path.getsize(filename)):
+            return self.local.digest(filename)
+        try:
+            return self.submit(file_digest, os.path.abspath(filename))
+        except BrokenProcessPool:
+            self.fallback()
+            return self.local.digest(filename)
+
+    def compress(self, codec, data):
+        if not self.offload(len(data)):
+            return self.local.compress(codec, data)
+        # hasil yang lebih besar dari aslinya tidak dipakai, cukup dikembalikan lewat pipe
+        try:
+            return self.run('compress', data, len(data), codec.name)
+        except BrokenProcessPool:
+            self.fallback()
+            return self.local.compress(codec, data)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def stats(self):
+        with self.lock:
+            return dict(codec='process', workers=self.workers, offloaded=self.offloaded,
+                        offloaded_bytes=self.offloaded_bytes, inline=self.inline,
+                        restarts=self.restarts, fallbacks=self.fallbacks)
@@ -0,0 +1,176 @@
+import os
+import zlib
+import struct
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+"""
+* kompresi payload mode biner yang dinegosiasikan per request: client
+mengirim daftar encoding yang diterimanya di header frame
+(accept_encoding), server memilih encoding pertama yang tersedia dan
+menuliskannya di header balasan (data_encoding). Tanpa data_encoding
+payload adalah isi file apa adanya
+
+* zlib selalu tersedia; zstd dan lz4 hanya jika modul zstandard /
+lz4 terpasang
+
+* payload yang panjangnya belum diketahui saat header dikirim (file besar
+yang dikompres sambil dikirim) memakai panjang payload CHUNKED dan
+dikirim sebagai potongan: panjang 4 byte lalu data, diakhiri potongan
+dengan panjang 0
+"""
+
+CHUNK_SIZE = 64 * 1024
+CHUNKED = 2 ** 64 - 1
+CHUNK_PREFIX = struct.Struct('!I')
+# kompresi dipakai hanya jika hasilnya paling besar 90% dari ukuran asli
+MIN_RATIO = 0.9
+# isi file dengan ekstensi ini sudah terkompresi, tidak dikompres lagi
+COMPRESSED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp3', '.mp4', '.mkv', '.avi', '.mov',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.lz4', '.7z', '.rar', '.jar', '.apk',
+}
+
+
+class ZlibCodec:
+    name = 'zlib'
+
+    def compressor(self):
+        return zlib.compressobj(6)
+
+    def decompressor(self):
+        return zlib.decompressobj()
+
+    def compress(self, data):
+        return zlib.compress(data, 6)
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=3).compressobj()
+
+    def decompressor(self):
+        return StreamDecompressor(zstandard.ZstdDecompressor().decompressobj())
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+class Lz4Compressor:
+    # LZ4FrameCompressor dibungkus agar sama dengan compressobj zlib
+    def __init__(self):
+        self.compressor = lz4.frame.LZ4FrameCompressor()
+        self.started = False
+
+    def compress(self, data):
+        out = b''
+        if not self.started:
+            out = self.compressor.begin()
+            self.started = True
+        return out + self.compressor.compress(data)
+
+    def flush(self):
+        out = b'' if self.started else self.compressor.begin()
+        return out + self.compressor.flush()
+
+
+class Lz4Codec:
+    name = 'lz4'
+
+    def compressor(self):
+        return Lz4Compressor()
+
+    def decompressor(self):
+        return StreamDecompressor(lz4.frame.LZ4FrameDecompressor())
+
+    def compress(self, data):
+        return lz4.frame.compress(data)
+
+
+class StreamDecompressor:
+    # decompressor zstd / lz4 dengan flush() seperti decompressobj zlib
+    def __init__(self, decompressor):
+        self.decompressor = decompressor
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+    def flush(self):
+        return b''
+
+
+# urutan preferensi server jika client menerima beberapa encoding
+CODECS = {}
+if zstandard is not None:
+    CODECS['zstd'] = ZstdCodec()
+if lz4 is not None:
+    CODECS['lz4'] = Lz4Codec()
+CODECS['zlib'] = ZlibCodec()
+
+
+def choose_codec(accepted, filename):
+    if not accepted or os.path.splitext(filename)[1].lower() in COMPRESSED_EXTENSIONS:
+        return None
+    for name in CODECS:
+        if name in accepted:
+            return CODECS[name]
+    return None
+
+
+def worth_compressing(original_len, compressed_len):
+    return compressed_len <= original_len * MIN_RATIO
+
+
+class CompressedBody:
+    """
+    isi file yang dikompres sambil dikirim per CHUNK_SIZE dengan format
+    potongan CHUNKED. Jika hasil kompresi seluruhnya tidak melebihi
+    keep_limit, hasilnya diserahkan ke on_complete (untuk disimpan di
+    cache) setelah potongan terakhir
+    """
+    chunked = True
+
+    def __init__(self, fp, offset, length, codec, on_complete=None, keep_limit=0):
+        self.fp = fp
+        self.offset = offset
+        self.length = length
+        self.codec = codec
+        self.on_complete = on_complete
+        self.keep_limit = keep_limit
+
+    def __iter__(self):
+        compressor = self.codec.compressor()
+        kept = [] if self.on_complete is not None else None
+        kept_size = 0
+        self.fp.seek(self.offset)
+        remaining = self.length
+        while True:
+            chunk = self.fp.read(min(CHUNK_SIZE, remaining)) if remaining > 0 else b''
+            remaining -= len(chunk)
+            out = compressor.compress(chunk) if chunk else compressor.flush()
+            if kept is not None:
+                kept_size += len(out)
+                if kept_size <= self.keep_limit:
+                    kept.append(out)
+                else:
+                    kept = None
+            if out:
+                yield CHUNK_PREFIX.pack(len(out)) + out
+            if not chunk:
+                break
+        yield CHUNK_PREFIX.pack(0)
+        if kept is not None:
+            self.on_complete(b''.join(kept))
+
+    def close(self):
+        self.fp.close()
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+
+from file_protocol import FRAME_MAGIC, DELIMITER, RECV_SIZE, MessageReader, frame_prefix, payload_length
+from file_interface import FileBody, MultiBody, CHUNK_SIZE
+from file_profiling import profiler
+
+"""
+* handle_client dipakai bersama oleh semua server untuk melayani satu
+koneksi: membaca request (mode teks yang diakhiri "\\r\\n\\r\\n" atau
+frame biner), meneruskannya ke FileProtocol, lalu mengirim balasan
+dengan mode yang sama
+
+* payload berupa file dapat dikirim dengan strategi "sendfile" (zero
+copy lewat os.sendfile, kernel menyalin langsung dari file ke socket)
+atau "copy" (dibaca per potongan lalu dikirim). "sendfile" otomatis
+jatuh ke "copy" jika platform tidak mendukung atau payload bukan file
+
+* balasan dikirim dengan send_all, bukan socket.sendall: sejak Python 3.5
+timeout socket pada sendall membatasi lama pengiriman seluruh data,
+sehingga balasan besar ke client yang lambat (tetapi terus membaca)
+terputus. send_all memakai timeout sebagai batas tanpa kemajuan per send
+"""
+
+SEND_STRATEGIES = ("sendfile", "copy")
+
+
+class BodyReader:
+    """
+    payload frame request yang dibaca dari socket sesuai kebutuhan,
+    sehingga upload besar tidak pernah ditampung utuh di memori
+    """
+    def __init__(self, reader, length):
+        self.reader = reader
+        self.remaining = length
+
+    def __len__(self):
+        return self.remaining
+
+    def read(self, size=CHUNK_SIZE):
+        if self.remaining <= 0:
+            return b""
+        chunk = self.reader.read_some(min(size, self.remaining))
+        if not chunk:
+            raise ConnectionError("koneksi ditutup client")
+        self.remaining -= len(chunk)
+        return chunk
+
+    def drain(self):
+        # buang sisa payload yang tidak dibaca oleh perintah
+        while self.read():
+            pass
+
+
+# balasan untuk koneksi yang ditolak; dikirim sebagai pesan teks karena
+# mode koneksi belum diketahui (client mode biner juga mengenalinya)
+BUSY_RESPONSE = (json.dumps(dict(status='ERROR', data='server sibuk, coba lagi nanti', busy=True)) + "\r\n\r\n").encode()
+
+
+class AdmissionController:
+    """
+    batas jumlah koneksi yang sedang dilayani atau menunggu di antrean
+    pool. Koneksi di atas batas langsung dibalas BUSY_RESPONSE dan ditutup
+    sehingga antrean executor tidak tumbuh tanpa batas dan client tidak
+    menunggu sampai timeout
+    """
+    def __init__(self, pool_size, max_inflight=0):
+        self.pool_size = pool_size
+        # 0 = tanpa batas (perilaku lama, antrean executor tidak dibatasi)
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.lock = threading.Lock()
+
+    def admit(self):
+        with self.lock:
+            if self.max_inflight and self.inflight >= self.max_inflight:
+                self.rejected += 1
+                return False
+            self.inflight += 1
+            self.accepted += 1
+            self.max_queued = max(self.max_queued, self.inflight - self.pool_size)
+            return True
+
+    def release(self, *args):
+        # juga dipakai sebagai done callback future executor
+        with self.lock:
+            self.inflight -= 1
+
+    def reject(self, connection, client_address):
+        logging.info("Server busy, rejecting %s", client_address)
+        try:
+            connection.settimeout(1)
+            connection.sendall(BUSY_RESPONSE)
+            # baca sedikit data request yang sudah masuk agar close tidak
+            # mengirim RST sebelum client sempat membaca balasan
+            connection.setblocking(False)
+            connection.recv(RECV_SIZE)
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def stats(self):
+        with self.lock:
+            return dict(inflight=self.inflight, queued=max(0, self.inflight - self.pool_size),
+                        max_queued=self.max_queued, accepted=self.accepted, rejected=self.rejected,
+                        max_inflight=self.max_inflight)
+
+
+def add_admission_arguments(parser):
+    parser.add_argument("--max-inflight", type=int, default=0,
+                        help="batas koneksi aktif + antre, di atasnya client dibalas 'server sibuk' (0 = tanpa batas)")
+    parser.add_argument("--idle-timeout", type=float, default=60,
+                        help="detik menunggu request berikutnya pada koneksi keep-alive (0 = tanpa batas)")
+    parser.add_argument("--read-timeout", type=float, default=30,
+                        help="detik menunggu data client selama satu request (0 = tanpa batas)")
+
+
+def timeout_options(args):
+    return dict(idle_timeout=args.idle_timeout or None, read_timeout=args.read_timeout or None)
+
+
+def handle_frame(fp, connection, reader, send_strategy="sendfile"):
+    with profiler.span('recv'):
+        header, payload_len = reader.read_frame_header()
+    started = time.perf_counter_ns()
+    body = BodyReader(reader, payload_len)
+
+    hasil, data = fp.proses_frame(header, body)
+    body.drain()
+    with profiler.span('send'):
+        sent = send_frame(connection, hasil, data, send_strategy)
+    fp.metrics.record(str(header.get('command', '')).lower(), started, payload_len, sent,
+                      hasil.get('status') == 'OK')
+
+
+def send_all(connection, data):
+    # setiap send menunggu socket siap paling lama timeout socket lalu
+    # mengirim sebanyak yang muat, jadi timeout hanya terjadi jika client
+    # berhenti membaca
+    with memoryview(data) as view, view.cast('B') as octets:
+        sent = 0
+        while sent < len(octets):
+            sent += connection.send(octets[sent:])
+
+
+def can_sendfile(data):
+    return isinstance(data, FileBody) and hasattr(os, "sendfile")
+
+
+def send_frame(connection, hasil, data, send_strategy="sendfile"):
+    # payload bisa berupa bytes, FileBody, CompressedBody, atau MultiBody
+    # yang dikirim per potongan; hasilnya jumlah byte yang terkirim
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        prefix = frame_prefix(hasil, len(data))
+        send_all(connection, prefix)
+        if data:
+            send_all(connection, data)
+        return len(prefix) + len(data)
+    try:
+        prefix = frame_prefix(hasil, payload_length(data))
+        send_all(connection, prefix)
+        return len(prefix) + send_body(connection, data, send_strategy)
+    finally:
+        data.close()
+
+
+def send_body(connection, data, send_strategy="sendfile"):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        if data:
+            send_all(connection, data)
+        return len(data)
+    if isinstance(data, MultiBody):
+        # setiap file di MGET tetap bisa dikirim dengan sendfile
+        return sum(send_body(connection, part, send_strategy) for part in data.parts)
+    if send_strategy == "sendfile" and can_sendfile(data):
+        return connection.sendfile(data.fp, data.offset, len(data))
+    sent = 0
+    for chunk in data:
+        send_all(connection, chunk)
+        sent += len(chunk)
+    return sent
+
+
+def handle_client(fp, connection, client_address, reader=None, send_strategy="sendfile",
+                  idle_timeout=None, read_timeout=None):
+    # idle_timeout: batas menunggu request berikutnya pada koneksi yang
+    # menganggur; read_timeout: batas setiap recv/send selama request
+    # sedang dibaca, atau tanpa kemajuan saat dibalas (send_all dan
+    # socket.sendfile menerapkannya per potongan). None berarti tanpa batas
+    reader = reader or MessageReader(connection)
+    fp.metrics.connection_opened()
+    try:
+        while True:
+            if not len(reader):
+                connection.settimeout(idle_timeout)
+                try:
+                    if not reader.fill():
+                        return
+                except socket.timeout:
+                    logging.debug("Idle timeout for %s", client_address)
+                    return
+            connection.settimeout(read_timeout)
+            while len(reader) < len(FRAME_MAGIC):
+                if not reader.fill():
+                    return
+            if reader.startswith(FRAME_MAGIC):
+                handle_frame(fp, connection, reader, send_strategy)
+                continue
+            with profiler.span('recv'):
+                command_bytes = reader.read_until(DELIMITER)
+            if command_bytes is None:
+                break
+            started = time.perf_counter_ns()
+            with profiler.span('decode'):
+                command_str = command_bytes.decode()
+            logging.debug("[%s] Received: %.50s", client_address, command_str)
+            hasil = fp.proses_string(command_str)
+            response = (hasil + "\r\n\r\n").encode()
+            with profiler.span('send'):
+                send_all(connection, response)
+            # balasan JSON selalu diawali status (lihat FileInterface)
+            fp.metrics.record(fp.command_name(command_str), started, len(command_bytes), len(response),
+                              not hasil.startswith('{"status": "ERROR"'))
+    except socket.timeout:
+        logging.info("Read timeout for %s", client_address)
+    except Exception as e:
+        logging.error("Error handling client %s: %s", client_address, e)
+    finally:
+        fp.metrics.connection_closed()
+        connection.close()
+        logging.debug("Connection closed for %s", client_address)
@@ -1,17 +1,417 @@
 import os
 import json
-import base64
-from glob import glob
+import time
+import bisect
+import uuid
+import threading
+from collections import OrderedDict
+
+from file_storage import STORAGES
+from file_codec import LocalCodec
+from file_compression import CompressedBody, choose_codec, worth_compressing
+
+CHUNK_SIZE = 64 * 1024
+CACHE_BYTES = 64 * 1024 * 1024
+INDEX_POLL = 2.0
+# sesi multipart yang tidak di-commit/abort selama ini dihapus
+MULTIPART_TTL = 60 * 60
+# sesi kedaluwarsa dicari paling sering sekali per interval ini
+MULTIPART_CLEANUP_INTERVAL = 10 * 60
+# jumlah file maksimum per MGET/MDELETE; semua file MGET dibuka sekaligus
+BATCH_MAX = 256
+# total ukuran file MGET mode teks (seluruhnya ditampung dalam satu balasan)
+MGET_TEXT_BYTES = 64 * 1024 * 1024
+
+
+class ContentCache:
+    """
+    cache LRU untuk isi file yang sering diminta. Setiap entri disimpan
+    bersama (inode, mtime, ukuran) file saat dibaca; entri yang tidak lagi
+    cocok dengan file di disk dianggap miss. Total ukuran entri dibatasi
+    max_bytes, dan file yang lebih besar dari max_entry_bytes tidak
+    di-cache sama sekali (tetap dikirim bertahap)
+    """
+    def __init__(self, max_bytes=CACHE_BYTES, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, st):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == (st.st_ino, st.st_mtime_ns, st.st_size):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, st, value):
+        if len(value) > self.max_entry_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.used -= len(old[1])
+            self.entries[key] = ((st.st_ino, st.st_mtime_ns, st.st_size), value)
+            self.used += len(value)
+            while self.used > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.used -= len(evicted)
+
+    def invalidate(self, filename):
+        with self.lock:
+            for key in [k for k in self.entries if k[1] == filename]:
+                self.used -= len(self.entries.pop(key)[1])
+
+    def stats(self):
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, entries=len(self.entries),
+                        used_bytes=self.used, max_bytes=self.max_bytes)
+
+
+class FileBody:
+    """
+    isi file yang dikirim bertahap: iterasi menghasilkan potongan
+    berukuran paling banyak CHUNK_SIZE sehingga memori per koneksi
+    tidak bergantung pada ukuran file
+    """
+    def __init__(self, fp, offset=0, length=None):
+        self.fp = fp
+        self.offset = offset
+        self.length = os.fstat(fp.fileno()).st_size - offset if length is None else length
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        self.fp.seek(self.offset)
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.fp.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.fp.close()
+
+
+class MultiBody:
+    """
+    payload MGET: isi beberapa file (bytes atau FileBody) yang dikirim
+    berurutan dalam satu payload; panjang tiap bagian ada di header
+    """
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __len__(self):
+        return sum(len(part) for part in self.parts)
+
+    def __iter__(self):
+        for part in self.parts:
+            if isinstance(part, (bytes, bytearray, memoryview)):
+                if part:
+                    yield part
+            else:
+                yield from part
+
+    def close(self):
+        for part in self.parts:
+            if not isinstance(part, (bytes, bytearray, memoryview)):
+                part.close()
+
+
+class MultipartUpload:
+    """
+    sesi upload multipart: part-part dikirim bersamaan lewat beberapa
+    koneksi dan ditulis ke posisinya masing-masing di satu file sementara,
+    lalu file di-rename saat commit. Seluruh state ada di disk (file data
+    .mpu-<id> dan log .mpu-<id>.log berisi nama tujuan, ukuran, dan range
+    part yang sudah diterima) sehingga setiap part boleh dilayani oleh
+    thread maupun proses worker yang berbeda
+    """
+    PREFIX = '.mpu-'
+
+    def __init__(self, upload_id):
+        if not upload_id or any(c not in '0123456789abcdef' for c in upload_id):
+            raise ValueError(f"Upload id {upload_id} tidak valid")
+        self.upload_id = upload_id
+        self.path = f"{self.PREFIX}{upload_id}"
+        self.log_path = f"{self.path}.log"
+
+    @classmethod
+    def create(cls, filename, size=None):
+        upload = cls(uuid.uuid4().hex)
+        with open(upload.path, 'xb') as fp:
+            if size:
+                fp.truncate(size)
+        with open(upload.log_path, 'x') as log:
+            log.write(json.dumps(dict(filename=filename, size=size)) + '\n')
+        return upload
+
+    @classmethod
+    def cleanup(cls, max_age=MULTIPART_TTL):
+        limit = time.time() - max_age
+        for name in os.listdir('.'):
+            if name.startswith(cls.PREFIX) and name.endswith('.log'):
+                try:
+                    if os.stat(name).st_mtime < limit:
+                        cls(name[len(cls.PREFIX):-len('.log')]).abort()
+                except (OSError, ValueError):
+                    continue
+
+    def read_log(self):
+        try:
+            with open(self.log_path) as log:
+                meta = json.loads(log.readline())
+                parts = [tuple(map(int, line.split())) for line in log if line.strip()]
+        except FileNotFoundError:
+            raise ValueError(f"Upload {self.upload_id} tidak ditemukan")
+        return meta, parts
+
+    def write_part(self, offset, chunks, length=None):
+        # chunks: iterable bytes; range dicatat di log hanya setelah seluruh
+        # part tertulis, sehingga part yang terputus tidak dianggap diterima.
+        # Batas ukuran diperiksa sebelum menulis (length jika sudah diketahui,
+        # lalu setiap potongan), jadi part yang kebablasan tidak memperbesar
+        # file sementara
+        meta, _ = self.read_log()
+        size = meta['size']
+        if offset < 0 or (size is not None and offset > size):
+            raise ValueError('Offset part tidak valid')
+        if size is not None and length is not None and offset + length > size:
+            raise ValueError('Part melewati ukuran file')
+        written = 0
+        with open(self.path, 'r+b') as fp:
+            fp.seek(offset)
+            for chunk in chunks:
+                if size is not None and offset + written + len(chunk) > size:
+                    raise ValueError('Part melewati ukuran file')
+                fp.write(chunk)
+                written += len(chunk)
+        length = written
+        # satu baris pendek dengan O_APPEND tidak tercampur antar proses
+        with open(self.log_path, 'a') as log:
+            log.write(f"{offset} {length}\n")
+        return length
+
+    def commit(self, storage):
+        meta, parts = self.read_log()
+        end = 0
+        for offset, length in sorted(parts):
+            if offset > end:
+                raise ValueError(f"Part mulai byte {end} belum diterima")
+            end = max(end, offset + length)
+        size = meta['size'] if meta['size'] is not None else end
+        if end < size:
+            raise ValueError(f"Part mulai byte {end} belum diterima")
+        with open(self.path, 'r+b') as fp:
+            fp.truncate(size)
+        storage.install_file(self.path, meta['filename'])
+        os.remove(self.log_path)
+        return meta['filename']
+
+    def abort(self):
+        for path in (self.path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def read_chunks(body, chunk_size=CHUNK_SIZE):
+    # body request mode biner sebagai iterable potongan bytes
+    while True:
+        chunk = body.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class IndexEntry:
+    __slots__ = ('name', 'size', 'mtime_ns', 'ino', 'digest')
+
+    def __init__(self, name, st, old=None):
+        self.name = name
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.ino = st.st_ino
+        # hash SHA-256 isi file, dihitung saat pertama diminta (STAT) dan
+        # dibawa ke entri baru selama file tidak berubah
+        self.digest = old.digest if old is not None and old.same(st) else None
+
+    def same(self, st):
+        return (self.ino, self.size, self.mtime_ns) == (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class DirectoryIndex:
+    """
+    daftar file (nama, ukuran, mtime) yang dibangun sekali saat start dan
+    diperbarui oleh UPLOAD/DELETE, sehingga LIST tidak perlu memindai
+    direktori setiap request. Perubahan dari luar proses ini (file disalin
+    manual, worker lain pada server multiprocess) terlihat dari mtime
+    direktori yang berubah; mtime diperiksa setiap LIST (satu stat) dan
+    oleh thread watcher setiap poll_interval detik, yang juga memindai
+    ulang seluruh direktori setiap full_scan_every kali poll
+    """
+    def __init__(self, directory='.', poll_interval=INDEX_POLL, full_scan_every=10):
+        self.directory = os.path.abspath(directory)
+        self.poll_interval = poll_interval
+        self.full_scan_every = full_scan_every
+        self.entries = {}
+        self.names = []     # nama terurut, untuk filter prefix dan paginasi
+        self.lock = threading.Lock()
+        self.dir_mtime_ns = None
+        self.scan()
+        if poll_interval:
+            threading.Thread(target=self.watch, daemon=True).start()
+
+    def scan(self):
+        self.dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        old = self.entries
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                # file berawalan titik adalah file sementara upload / tersembunyi
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    entries[entry.name] = IndexEntry(entry.name, entry.stat(), old.get(entry.name))
+                except FileNotFoundError:
+                    continue
+        with self.lock:
+            self.entries = entries
+            self.names = sorted(entries)
+
+    def watch(self):
+        polls = 0
+        while True:
+            time.sleep(self.poll_interval)
+            polls += 1
+            try:
+                if polls % self.full_scan_every == 0:
+                    self.scan()
+                else:
+                    self.check()
+            except Exception:
+                continue
+
+    def check(self):
+        if os.stat(self.directory).st_mtime_ns != self.dir_mtime_ns:
+            self.scan()
+
+    def refresh(self, name):
+        # perbarui satu entri setelah file ditulis atau dihapus; perubahan
+        # mtime direktori karena operasi ini sendiri tidak perlu scan ulang
+        # (perubahan lain yang kebetulan bersamaan tertangkap scan penuh)
+        try:
+            st = os.stat(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            st = None
+        dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        with self.lock:
+            self.dir_mtime_ns = dir_mtime_ns
+            if st is None:
+                if self.entries.pop(name, None) is not None:
+                    del self.names[bisect.bisect_left(self.names, name)]
+                return
+            if name not in self.entries:
+                bisect.insort(self.names, name)
+            self.entries[name] = IndexEntry(name, st, self.entries.get(name))
+
+    def get(self, name):
+        with self.lock:
+            return self.entries.get(name)
+
+    def set_digest(self, name, st, digest):
+        # simpan hash hanya jika entri masih menggambarkan file yang di-hash
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry.same(st):
+                entry.digest = digest
+
+    def list(self, prefix='', offset=0, limit=None):
+        # nama file berawalan prefix, mulai dari offset, paling banyak limit;
+        # hasilnya (daftar nama, jumlah seluruh nama yang cocok)
+        self.check()
+        with self.lock:
+            start = bisect.bisect_left(self.names, prefix)
+            end = bisect.bisect_left(self.names, prefix + '\U0010ffff') if prefix else len(self.names)
+            stop = end if limit is None else min(end, start + offset + limit)
+            return self.names[start + offset:stop], end - start
+
+
+def parse_range(params, size):
+    # parameter GET setelah nama file: [offset [length]]; length kosong
+    # berarti sampai akhir file dan dipotong jika melewati akhir file
+    offset = int(params[1]) if len(params) > 1 else 0
+    length = int(params[2]) if len(params) > 2 else size - offset
+    if offset < 0 or length < 0 or offset > size:
+        raise ValueError(f"Range tidak valid (ukuran file {size})")
+    return offset, min(length, size - offset)
 
 
 class FileInterface:
-    def __init__(self):
+    def __init__(self, cache_bytes=CACHE_BYTES, index_poll=INDEX_POLL, storage='plain', codec=None):
         os.chdir('files/')
+        # kerja CPU berat (base64, hash, kompresi) lewat codec; ProcessCodec
+        # menjalankannya di process pool (lihat file_codec)
+        self.codec = codec or LocalCodec()
+        # storage 'plain' menyimpan file apa adanya, 'cas' menyimpan isi
+        # file per hash sehingga upload duplikat tidak ditulis ulang
+        self.storage = STORAGES[storage]()
+        # cache_bytes=0 mematikan cache isi file
+        self.cache = ContentCache(cache_bytes) if cache_bytes else None
+        # index_poll=0 mematikan watcher; index tetap diperbarui oleh UPLOAD/DELETE
+        self.index = DirectoryIndex('.', poll_interval=index_poll)
+        self.next_cleanup = 0
+
+    def cleanup_multipart(self):
+        # sesi multipart kedaluwarsa dibersihkan paling sering sekali per
+        # MULTIPART_CLEANUP_INTERVAL, bukan dengan listdir setiap UPLOAD_INIT
+        now = time.monotonic()
+        if now < self.next_cleanup:
+            return
+        self.next_cleanup = now + MULTIPART_CLEANUP_INTERVAL
+        MultipartUpload.cleanup()
+
+    def read_cached(self, fp, filename, kind):
+        # isi file dari cache jika masih cocok dengan file yang dibuka;
+        # kind 'raw' untuk bytes mentah, 'b64' untuk hasil base64 mode teks
+        st = os.fstat(fp.fileno())
+        if self.cache is None:
+            return None, st
+        return self.cache.get((kind, filename), st), st
+
+    def changed(self, filename):
+        # dipanggil setelah file ditulis atau dihapus
+        if self.cache is not None:
+            self.cache.invalidate(filename)
+        self.index.refresh(filename)
 
     def list(self,params=[]):
+        # parameter opsional: prefix=..., offset=..., limit=...
         try:
-            filelist = glob('*.*')
-            return dict(status='OK',data=filelist)
+            options = {}
+            for p in params:
+                name, sep, value = p.partition('=')
+                if not sep or name not in ('prefix', 'offset', 'limit'):
+                    return dict(status='ERROR',data=f'Parameter tidak valid: {p} (pakai prefix=, offset=, limit=)')
+                options[name] = value
+            prefix = options.get('prefix', '')
+            try:
+                offset = int(options.get('offset', 0))
+                limit = int(options['limit']) if 'limit' in options else None
+            except ValueError:
+                return dict(status='ERROR',data='offset dan limit harus bilangan bulat')
+            if offset < 0 or (limit is not None and limit < 0):
+                return dict(status='ERROR',data='offset dan limit tidak boleh negatif')
+            filelist, total = self.index.list(prefix, offset, limit)
+            return dict(status='OK',data=filelist,data_total=total)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
 
@@ -20,12 +420,121 @@ class FileInterface:
             filename = params[0]
             if (filename == ''):
                 return None
-            fp = open(f"{filename}",'rb')
-            isifile = base64.b64encode(fp.read()).decode()
-            return dict(status='OK',data_namafile=filename,data_file=isifile)
+            with open(f"{filename}",'rb') as fp:
+                if len(params) > 1:
+                    # GET sebagian: hanya range yang diminta yang dibaca
+                    st = os.fstat(fp.fileno())
+                    offset, length = parse_range(params, st.st_size)
+                    fp.seek(offset)
+                    isifile = self.codec.b64encode(fp.read(length))
+                    return dict(status='OK',data_namafile=filename,data_file=isifile,data_size=st.st_size,
+                                data_mtime_ns=st.st_mtime_ns,data_offset=offset,data_length=length)
+                isifile, st = self.read_cached(fp, filename, 'b64')
+                if isifile is None:
+                    isifile = self.codec.b64encode(fp.read())
+                    if self.cache is not None:
+                        self.cache.put(('b64', filename), st, isifile)
+            return dict(status='OK',data_namafile=filename,data_file=isifile,data_size=st.st_size,
+                        data_mtime_ns=st.st_mtime_ns)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
 
+    def get_stream(self, params=[], encodings=(), fill_cache=True):
+        # versi GET untuk mode biner: isi file tidak dibaca sekaligus,
+        # melainkan dikirim bertahap per CHUNK_SIZE oleh handler.
+        # encodings: kompresi yang diterima client (lihat file_compression).
+        # fill_cache=False: file yang belum ada di cache tetap dikirim
+        # bertahap, tidak dibaca utuh untuk mengisi cache
+        try:
+            filename = params[0]
+            if (filename == ''):
+                return dict(status='ERROR', data='Parameter tidak lengkap'), b''
+            fp = open(filename, 'rb')
+            try:
+                isifile, st = self.read_cached(fp, filename, 'raw')
+                offset, length = parse_range(params, st.st_size)
+            except Exception:
+                fp.close()
+                raise
+            if isifile is None and fill_cache and self.cache is not None and st.st_size <= self.cache.max_entry_bytes:
+                # file kecil dibaca utuh agar request berikutnya dilayani dari memori
+                isifile = fp.read()
+                self.cache.put(('raw', filename), st, isifile)
+            hasil = dict(status='OK', data_namafile=filename, data_size=st.st_size, data_mtime_ns=st.st_mtime_ns,
+                         data_offset=offset, data_length=length)
+            codec = choose_codec(encodings, filename)
+            if codec is not None:
+                encoded = self.encode(fp, filename, st, offset, length, isifile, codec)
+                if encoded is not None:
+                    hasil['data_encoding'] = codec.name
+                    return hasil, encoded
+            if isifile is not None:
+                fp.close()
+                if length != len(isifile):
+                    isifile = isifile[offset:offset + length]
+                return hasil, isifile
+            return hasil, FileBody(fp, offset, length)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e)), b''
+
+    def encode(self, fp, filename, st, offset, length, isifile, codec):
+        # payload terkompresi untuk GET, atau None jika isi file tidak
+        # cukup mengecil (dikirim apa adanya). Hasil kompresi file utuh
+        # disimpan di cache per encoding; b'' menandai file yang tidak
+        # layak dikompres agar tidak dicoba ulang setiap request
+        key = (codec.name, filename)
+        cache = self.cache if offset == 0 and length == st.st_size else None
+        if cache is not None:
+            encoded = cache.get(key, st)
+            if encoded is not None:
+                if not encoded:
+                    return None
+                fp.close()
+                return encoded
+        if isifile is not None:
+            data = isifile[offset:offset + length]
+            encoded = self.codec.compress(codec, data)
+            worth = worth_compressing(len(data), len(encoded))
+            if cache is not None:
+                cache.put(key, st, encoded if worth else b'')
+            if not worth:
+                return None
+            fp.close()
+            return encoded
+        # file besar: cukup contoh potongan pertama untuk memutuskan
+        fp.seek(offset)
+        sample = fp.read(min(CHUNK_SIZE, length))
+        if not worth_compressing(len(sample), len(codec.compress(sample))):
+            return None
+        if cache is None:
+            return CompressedBody(fp, offset, length, codec)
+        return CompressedBody(fp, offset, length, codec,
+                              on_complete=lambda encoded: cache.put(key, st, encoded),
+                              keep_limit=cache.max_entry_bytes)
+
+    def stat(self, params=[]):
+        # STAT nama: ukuran, mtime, dan hash SHA-256 isi file. Hash dihitung
+        # sekali lalu disimpan di index selama file tidak berubah
+        try:
+            if len(params) < 1:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+            filename = params[0]
+            st = os.stat(filename)
+            entry = self.index.get(filename)
+            if entry is None or not entry.same(st):
+                self.index.refresh(filename)
+                entry = self.index.get(filename)
+            digest = entry.digest if entry is not None and entry.same(st) else None
+            if digest is None:
+                digest = self.storage.digest(filename) or self.codec.digest(filename)
+                self.index.set_digest(filename, st, digest)
+            return dict(status='OK', data_namafile=filename, data_size=st.st_size,
+                        data_mtime_ns=st.st_mtime_ns, data_sha256=digest)
+        except FileNotFoundError:
+            return dict(status='ERROR', data=f"File {params[0]} tidak ditemukan")
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
     def upload(self, params=[]):
         try:
             if len(params) < 2:
@@ -34,15 +543,103 @@ class FileInterface:
             filename = params[0]
             file_content = params[1]
             
-            file_bytes = base64.b64decode(file_content)
+            file_bytes = self.codec.b64decode(file_content)
             
-            with open(filename, 'wb') as fp:
-                fp.write(file_bytes)
+            upload = self.storage.writer(filename)
+            try:
+                upload.write(file_bytes)
+                upload.commit()
+            except Exception:
+                upload.abort()
+                raise
+            self.changed(filename)
                 
             return dict(status='OK', data=f"File {filename} berhasil diupload")
         except Exception as e:
             return dict(status='ERROR', data=str(e))
 
+    def upload_stream(self, params=[], body=None):
+        # versi UPLOAD untuk mode biner: body dibaca dari socket per
+        # CHUNK_SIZE dan langsung ditulis ke file sementara
+        try:
+            if len(params) < 1:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+
+            filename = params[0]
+
+            upload = self.storage.writer(filename)
+            try:
+                while True:
+                    chunk = body.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    upload.write(chunk)
+                upload.commit()
+            except Exception:
+                upload.abort()
+                raise
+            self.changed(filename)
+
+            return dict(status='OK', data_namafile=filename, data=f"File {filename} berhasil diupload")
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
+    def upload_init(self, params=[]):
+        # UPLOAD_INIT nama [ukuran]: membuka sesi multipart
+        try:
+            if len(params) < 1:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+            filename = params[0]
+            size = int(params[1]) if len(params) > 1 else None
+            self.cleanup_multipart()
+            upload = MultipartUpload.create(filename, size)
+            return dict(status='OK', data_namafile=filename, data_upload_id=upload.upload_id)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
+    def upload_part(self, params=[]):
+        # UPLOAD_PART id offset isi_base64 (mode teks)
+        try:
+            if len(params) < 3:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+            upload = MultipartUpload(params[0])
+            offset = int(params[1])
+            length = upload.write_part(offset, [self.codec.b64decode(params[2])])
+            return dict(status='OK', data_offset=offset, data_length=length)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
+    def upload_part_stream(self, params=[], body=None):
+        # UPLOAD_PART id offset dengan isi part sebagai payload frame
+        try:
+            if len(params) < 2:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+            upload = MultipartUpload(params[0])
+            offset = int(params[1])
+            length = upload.write_part(offset, read_chunks(body), len(body))
+            return dict(status='OK', data_offset=offset, data_length=length)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
+    def upload_commit(self, params=[]):
+        try:
+            if len(params) < 1:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+            filename = MultipartUpload(params[0]).commit(self.storage)
+            self.changed(filename)
+            return dict(status='OK', data_namafile=filename, data=f"File {filename} berhasil diupload")
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
+    def upload_abort(self, params=[]):
+        try:
+            if len(params) < 1:
+                return dict(status='ERROR', data='Parameter tidak lengkap')
+            MultipartUpload(params[0]).abort()
+            return dict(status='OK', data=f"Upload {params[0]} dibatalkan")
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
     def delete(self, params=[]):
         try:
             if len(params) < 1:
@@ -50,14 +647,61 @@ class FileInterface:
                 
             filename = params[0]
             
-            if not os.path.exists(filename):
+            if not os.path.lexists(filename):
                 return dict(status='ERROR', data=f"File {filename} tidak ditemukan")
                 
-            os.remove(filename)
+            self.storage.remove(filename)
+            self.changed(filename)
             return dict(status='OK', data=f"File {filename} berhasil dihapus")
         except Exception as e:
             return dict(status='ERROR', data=str(e))
 
+    def mget(self, params=[]):
+        # MGET nama1 nama2 ...: hasil GET tiap file dalam satu balasan
+        if not params or len(params) > BATCH_MAX:
+            return dict(status='ERROR', data=f"Jumlah file harus 1 sampai {BATCH_MAX}")
+        # mode teks menampung semua isi file (base64) dalam satu balasan,
+        # jadi total ukurannya dibatasi
+        total = 0
+        for filename in params:
+            try:
+                total += os.path.getsize(filename)
+            except OSError:
+                continue
+        if total > MGET_TEXT_BYTES:
+            return dict(status='ERROR', data=f"Total ukuran file MGET melebihi {MGET_TEXT_BYTES // (1024 * 1024)} MB, "
+                                             f"gunakan mode biner")
+        return dict(status='OK', data=[self.get([filename]) for filename in params])
+
+    def mget_stream(self, params=[]):
+        # versi MGET mode biner: header berisi hasil tiap file (data_files)
+        # dan payload berisi isi file-file yang berhasil, berurutan. File
+        # yang ada di cache dikirim dari memori, sisanya sebagai FileBody
+        # yang dibaca bertahap saat dikirim, sehingga memori per request
+        # tidak bergantung pada jumlah dan ukuran file
+        if not params or len(params) > BATCH_MAX:
+            return dict(status='ERROR', data=f"Jumlah file harus 1 sampai {BATCH_MAX}"), b''
+        files, parts = [], []
+        for filename in params:
+            hasil, data = self.get_stream([filename], fill_cache=False)
+            files.append(hasil)
+            if hasil['status'] == 'OK':
+                parts.append(data)
+        return dict(status='OK', data_files=files), MultiBody(parts)
+
+    def mdelete(self, params=[]):
+        # MDELETE nama1 nama2 ...: status per file; status keseluruhan OK
+        # walaupun sebagian file gagal dihapus
+        if not params or len(params) > BATCH_MAX:
+            return dict(status='ERROR', data=f"Jumlah file harus 1 sampai {BATCH_MAX}")
+        results = []
+        for filename in params:
+            hasil = self.delete([filename])
+            hasil['data_namafile'] = filename
+            results.append(hasil)
+        return dict(status='OK', data=results,
+                    data_deleted=sum(1 for hasil in results if hasil['status'] == 'OK'))
+
 if __name__=='__main__':
     f = FileInterface()
     print(f.list())
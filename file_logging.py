@@ -0,0 +1,137 @@
+import sys
+import queue
+import logging
+import threading
+import multiprocessing.util
+from logging.handlers import QueueHandler, QueueListener
+
+"""
+* logging server yang tidak membebani thread yang melayani request:
+  - log per koneksi/per request memakai level DEBUG dengan argumen gaya
+    %s, sehingga jika level DEBUG tidak aktif pesan tidak pernah
+    diformat sama sekali
+  - record hanya dimasukkan ke antrean terbatas; format dan penulisan ke
+    stderr dikerjakan thread QueueListener. Jika antrean penuh record
+    dibuang dan dihitung, request tidak pernah menunggu logging
+  - pesan dipotong sampai max_chars karakter (payload UPLOAD tidak pernah
+    tertulis utuh) dan log di bawah WARNING dapat di-sampling 1 dari N
+
+* setelah fork (worker multiprocess) antrean dan listener dibuat ulang
+di proses anak, karena thread listener milik parent tidak ikut ter-fork
+"""
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+LOG_QUEUE_SIZE = 10000
+LOG_MAX_CHARS = 200
+
+# pipeline aktif; disimpan di sini agar tetap hidup (register_after_fork
+# hanya memegang weak reference)
+pipeline = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler yang tidak memformat record di thread pemanggil (antrean
+    hanya dipakai di dalam proses, record tidak perlu di-pickle) dan
+    membuang record jika antrean penuh
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    # hanya 1 dari setiap `every` record di bawah WARNING yang diteruskan
+    def __init__(self, every=1):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            self.seen += 1
+            return self.seen % self.every == 1
+
+
+class TruncatingFormatter(logging.Formatter):
+    def __init__(self, fmt=LOG_FORMAT, max_chars=LOG_MAX_CHARS):
+        super().__init__(fmt)
+        self.max_chars = max_chars
+
+    def formatMessage(self, record):
+        message = record.message
+        if self.max_chars and len(message) > self.max_chars:
+            record.message = f"{message[:self.max_chars]}... ({len(message)} karakter)"
+        return super().formatMessage(record)
+
+
+class LogPipeline:
+    def __init__(self, level, sample, max_chars):
+        self.output = logging.StreamHandler(sys.stderr)
+        self.output.setFormatter(TruncatingFormatter(max_chars=max_chars))
+        self.handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.handler.addFilter(SamplingFilter(sample))
+        self.listener = None
+        root = logging.getLogger()
+        for old in root.handlers[:]:
+            root.removeHandler(old)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self.start()
+        multiprocessing.util.register_after_fork(self, LogPipeline.restart)
+
+    def start(self):
+        self.listener = QueueListener(self.handler.queue, self.output)
+        self.listener.start()
+
+    def restart(self):
+        # worker multiprocessing hasil fork: antrean baru dan listener baru;
+        # sisa log ditulis saat worker berhenti
+        self.handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler.dropped = 0
+        self.start()
+        multiprocessing.util.Finalize(None, self.stop, exitpriority=1)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        if self.handler.dropped:
+            self.output.handle(logging.makeLogRecord(dict(
+                levelno=logging.WARNING, levelname='WARNING',
+                msg=f"{self.handler.dropped} log record dibuang (antrean penuh)")))
+            self.handler.dropped = 0
+
+
+def setup_logging(level='WARNING', sample=1, max_chars=LOG_MAX_CHARS):
+    # pengganti logging.basicConfig untuk server; listener dihentikan
+    # (dan sisa antrean ditulis) saat proses selesai
+    global pipeline
+    pipeline = LogPipeline(level, sample, max_chars)
+    multiprocessing.util.Finalize(None, pipeline.stop, exitpriority=1)
+    return pipeline
+
+
+def add_logging_arguments(parser):
+    parser.add_argument("--log-level", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="WARNING",
+                        help="DEBUG menampilkan log per koneksi dan per request")
+    parser.add_argument("--log-sample", type=int, default=1,
+                        help="log di bawah WARNING hanya ditulis 1 dari N")
+    parser.add_argument("--log-max-chars", type=int, default=LOG_MAX_CHARS,
+                        help="pesan log dipotong sepanjang ini (0 = tidak dipotong)")
+
+
+def logging_options(args):
+    return dict(level=args.log_level, sample=args.log_sample, max_chars=args.log_max_chars)
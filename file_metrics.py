@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+* metrik server: per request dicatat jumlah, error, byte masuk/keluar,
+dan latensi (dari request selesai dibaca sampai balasan selesai dikirim)
+dalam histogram. Selain itu jumlah koneksi dan gauge yang didaftarkan
+server (antrean executor, admission, cache, storage, codec)
+
+* dibaca lewat request STATS (lihat PROTOKOL.txt) atau endpoint HTTP
+lokal opsional (--metrics-port): /metrics berformat teks seperti
+Prometheus, /metrics.json berisi JSON yang sama dengan STATS
+
+* metrik disimpan per proses: pada server multiprocess setiap worker
+punya metrik sendiri dan STATS menjawab metrik worker yang melayaninya
+"""
+
+# histogram log-linear seperti HdrHistogram: setiap rentang pangkat dua
+# dibagi SUB_BUCKETS bucket, sehingga galat relatif nilai <= 1/SUB_BUCKETS
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+# latensi dicatat dalam mikrodetik, sampai 2**40 us (~12 hari)
+MAX_BITS = 40
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * ((MAX_BITS - SUB_BITS + 2) * SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def index(value):
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BITS - 1
+        return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def upper(index):
+        # nilai terbesar yang masuk ke bucket index
+        if index < SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value):
+        value = min(max(int(value), 0), (1 << MAX_BITS) - 1)
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        target = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.upper(index), self.max)
+        return self.max
+
+    def snapshot(self):
+        hasil = dict(count=self.count, min=self.min or 0, max=self.max,
+                     mean=round(self.total / self.count, 1) if self.count else 0)
+        for q in QUANTILES:
+            hasil[f"p{q * 100:g}"] = self.percentile(q)
+        return hasil
+
+
+class CommandMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency_us = LatencyHistogram()
+
+    def snapshot(self):
+        return dict(requests=self.requests, errors=self.errors, bytes_in=self.bytes_in,
+                    bytes_out=self.bytes_out, latency_us=self.latency_us.snapshot())
+
+
+class ServerMetrics:
+    """
+    dipanggil dari jalur handle_client, jadi setiap pencatatan hanya
+    beberapa penjumlahan di bawah satu lock; snapshot (lebih mahal)
+    hanya dibuat saat STATS atau endpoint HTTP diminta
+    """
+    def __init__(self, commands=()):
+        self.started = time.time()
+        # nama request yang tidak dikenal digabung ke "other" agar jumlah
+        # entri tidak bisa dibuat tumbuh oleh client
+        self.commands = {name: CommandMetrics() for name in commands}
+        self.commands['other'] = CommandMetrics()
+        self.connections_total = 0
+        self.connections_active = 0
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def add_gauge(self, name, fn):
+        # fn() mengembalikan angka atau dict angka, dibaca saat snapshot
+        self.gauges[name] = fn
+
+    def connection_opened(self):
+        with self.lock:
+            self.connections_total += 1
+            self.connections_active += 1
+
+    def connection_closed(self):
+        with self.lock:
+            self.connections_active -= 1
+
+    def record(self, command, started_ns, bytes_in, bytes_out, ok=True):
+        elapsed_us = (time.perf_counter_ns() - started_ns) // 1000
+        with self.lock:
+            m = self.commands.get(command) or self.commands['other']
+            m.requests += 1
+            if not ok:
+                m.errors += 1
+            m.bytes_in += bytes_in
+            m.bytes_out += bytes_out
+            m.latency_us.record(elapsed_us)
+
+    def snapshot(self):
+        with self.lock:
+            commands = {name: m.snapshot() for name, m in self.commands.items() if m.requests}
+            hasil = dict(pid=os.getpid(), uptime=round(time.time() - self.started, 1),
+                         connections_total=self.connections_total,
+                         connections_active=self.connections_active, commands=commands)
+        for name, fn in self.gauges.items():
+            try:
+                hasil[name] = fn()
+            except Exception as e:
+                hasil[name] = str(e)
+        return hasil
+
+
+class CountingThreadPool(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor yang menghitung sendiri pekerjaan yang sudah
+    di-submit tetapi belum mulai dijalankan (gauge executor_queue), tanpa
+    membaca antrean internal executor. Pekerjaan yang dibatalkan sebelum
+    mulai juga keluar dari hitungan
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queued = 0
+        self.queue_lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        waiting = [True]
+
+        def run(*args, **kwargs):
+            self.dequeue(waiting)
+            return fn(*args, **kwargs)
+
+        with self.queue_lock:
+            self.queued += 1
+        try:
+            future = super().submit(run, *args, **kwargs)
+        except BaseException:
+            self.dequeue(waiting)
+            raise
+        future.add_done_callback(lambda _: self.dequeue(waiting))
+        return future
+
+    def dequeue(self, waiting):
+        with self.queue_lock:
+            if waiting[0]:
+                waiting[0] = False
+                self.queued -= 1
+
+    def queue_size(self):
+        with self.queue_lock:
+            return self.queued
+
+
+def render_text(snapshot):
+    # format teks sederhana ala Prometheus: nama{label} nilai
+    lines = []
+    for key in ('uptime', 'connections_total', 'connections_active'):
+        lines.append(f"file_server_{key} {snapshot[key]}")
+    for name, m in snapshot['commands'].items():
+        for key in ('requests', 'errors', 'bytes_in', 'bytes_out'):
+            lines.append(f'file_server_{key}_total{{command="{name}"}} {m[key]}')
+        for key, value in m['latency_us'].items():
+            lines.append(f'file_server_latency_us{{command="{name}",stat="{key}"}} {value}')
+    for name, value in snapshot.items():
+        if name in ('pid', 'uptime', 'connections_total', 'connections_active', 'commands'):
+            continue
+        values = value if isinstance(value, dict) else {'': value}
+        for key, v in values.items():
+            if isinstance(v, bool) or not isinstance(v, (int, float)):
+                continue
+            lines.append(f"file_server_{name}{'_' + key if key else ''} {v}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        snapshot = self.server.metrics.snapshot()
+        if self.path == '/metrics':
+            body, content_type = render_text(snapshot).encode(), 'text/plain; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(snapshot).encode(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # akses endpoint metrik tidak perlu masuk log server
+        pass
+
+
+def start_metrics_server(metrics, host='127.0.0.1', port=0):
+    # endpoint HTTP di thread daemon; port 0 = tidak dijalankan
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="port endpoint HTTP /metrics dan /metrics.json (0 = mati)")
+    parser.add_argument("--metrics-host", default="127.0.0.1",
+                        help="alamat endpoint metrik, default hanya lokal")
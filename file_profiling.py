@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import cProfile
+import pstats
+import threading
+import multiprocessing.util
+from collections import Counter
+from contextlib import nullcontext
+
+"""
+* profiling opt-in untuk server (--profile). Tanpa --profile semua hook
+di bawah hanya mengembalikan context kosong sehingga biayanya sekadar
+satu pemanggilan method per titik ukur
+
+* span: waktu kumulatif per tahap request, mis. recv dan send (loop
+socket), parse, command.<nama>, json (FileProtocol) dan codec.<kerja>
+(base64, hash, kompresi). Dibaca lewat request PROFILE tanpa parameter
+
+* window: profil detail selama beberapa detik, dimulai dengan request
+"PROFILE cprofile|sample detik" atau sinyal (SIGUSR1 = cprofile,
+SIGUSR2 = sample) ke proses server atau worker multiprocess/prefork.
+Worker codec server hybrid tidak diprofil dan mengabaikan kedua
+sinyal tersebut, sehingga sinyal aman dikirim ke seluruh process group:
+  - cprofile: setiap request selama window dijalankan di bawah
+    cProfile (per thread), hasilnya digabung ke satu file .prof
+    (baca dengan pstats / snakeviz). Sejak Python 3.12 hanya satu
+    profiler boleh aktif per proses dan profiler itu mencakup semua
+    thread, jadi di sana satu cProfile dipakai untuk seluruh window.
+    Jika cProfile tidak bisa diaktifkan request tetap dilayani tanpa
+    profil
+  - sample: thread sampler membaca stack semua thread setiap
+    SAMPLE_INTERVAL detik dan menulis format "collapsed" (satu stack per
+    baris diikuti jumlah sampel) untuk flamegraph.pl / speedscope
+
+* semua hasil ditulis per proses ke direktori --profile-dir dengan nama
+<jenis>-<pid>-<waktu>, sehingga setiap worker multiprocess menghasilkan
+file sendiri; ringkasan span ikut ditulis di akhir setiap window
+"""
+
+PROFILE_WINDOW = 10.0
+SAMPLE_INTERVAL = 0.005
+PROFILE_MODES = ('cprofile', 'sample')
+# Python 3.12+: cProfile memakai sys.monitoring, satu profiler per proses
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+def enable_profile():
+    # cProfile yang sudah aktif, atau None jika profiler lain sedang aktif
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except Exception as e:
+        logging.debug("cProfile tidak bisa diaktifkan: %s", e)
+        return None
+    return profile
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+
+class Span:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.profiler.add_span(self.name, time.perf_counter_ns() - self.started)
+
+
+class ProfiledCodec:
+    # membungkus codec FileInterface agar setiap kerja CPU menjadi span
+    def __init__(self, codec, profiler):
+        self.codec = codec
+        self.profiler = profiler
+
+    def b64encode(self, data):
+        with self.profiler.span('codec.b64encode'):
+            return self.codec.b64encode(data)
+
+    def b64decode(self, text):
+        with self.profiler.span('codec.b64decode'):
+            return self.codec.b64decode(text)
+
+    def digest(self, filename):
+        with self.profiler.span('codec.digest'):
+            return self.codec.digest(filename)
+
+    def compress(self, codec, data):
+        with self.profiler.span('codec.compress'):
+            return self.codec.compress(codec, data)
+
+    def close(self):
+        self.codec.close()
+
+    def stats(self):
+        return self.codec.stats()
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.directory = os.path.abspath('profiles')
+        self.window = PROFILE_WINDOW
+        self.reset()
+        multiprocessing.util.register_after_fork(self, Profiler.reset)
+
+    def reset(self):
+        # juga dipanggil di worker hasil fork: span dan window milik parent
+        # tidak ikut dihitung
+        self.spans = {}
+        self.mode = None
+        self.window_end = 0
+        self.profiles = []
+        self.window_profile = None
+        self.samples = Counter()
+        self.lock = threading.Lock()
+
+    def configure(self, enabled=False, directory='profiles', window=PROFILE_WINDOW, signals=True):
+        self.enabled = enabled
+        # path absolut karena FileInterface pindah ke direktori files/
+        self.directory = os.path.abspath(directory)
+        self.window = window
+        if enabled and signals and hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.on_signal)
+            signal.signal(signal.SIGUSR2, self.on_signal)
+
+    def on_signal(self, signum, frame):
+        # handler sinyal tidak mengambil lock (thread utama bisa sedang
+        # memegangnya); window dimulai dari thread terpisah
+        mode = 'cprofile' if signum == signal.SIGUSR1 else 'sample'
+        threading.Thread(target=self.start_window, args=(mode,), daemon=True).start()
+
+    def span(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return Span(self, name)
+
+    def add_span(self, name, elapsed_ns):
+        with self.lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.count += 1
+            stats.total_ns += elapsed_ns
+            stats.max_ns = max(stats.max_ns, elapsed_ns)
+
+    def wrap_codec(self, codec):
+        return ProfiledCodec(codec, self) if self.enabled else codec
+
+    def span_stats(self):
+        with self.lock:
+            return {name: dict(count=s.count, total_ms=round(s.total_ns / 1e6, 3),
+                               mean_us=round(s.total_ns / s.count / 1e3, 1), max_us=round(s.max_ns / 1e3, 1))
+                    for name, s in sorted(self.spans.items(), key=lambda item: -item[1].total_ns)}
+
+    def start_window(self, mode='cprofile', seconds=None):
+        # hasilnya prefix path file yang akan ditulis saat window selesai
+        seconds = seconds or self.window
+        with self.lock:
+            if self.mode is not None:
+                raise RuntimeError(f"profil {self.mode} sedang berjalan")
+            self.mode = mode
+            self.window_end = time.monotonic() + seconds
+            self.profiles = []
+            self.samples = Counter()
+            if mode == 'cprofile' and PROCESS_WIDE_CPROFILE:
+                self.window_profile = enable_profile()
+                if self.window_profile is None:
+                    logging.warning("cProfile tidak bisa diaktifkan, window hanya mencatat span")
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"{mode}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}")
+        target = self.sample_loop if mode == 'sample' else self.wait_window
+        threading.Thread(target=target, args=(prefix,), daemon=True).start()
+        return prefix
+
+    def request(self):
+        # dipakai FileProtocol di sekitar satu request; sebelum Python 3.12
+        # cProfile hanya memprofil thread yang mengaktifkannya, jadi dibuat
+        # per request. Profil tidak pernah menggagalkan request
+        if self.mode != 'cprofile' or PROCESS_WIDE_CPROFILE:
+            return nullcontext()
+        profile = enable_profile()
+        if profile is None:
+            return nullcontext()
+        return RequestProfile(self, profile)
+
+    def wait_window(self, prefix):
+        time.sleep(max(0, self.window_end - time.monotonic()))
+        self.finish(prefix)
+
+    def sample_loop(self, prefix):
+        me = threading.get_ident()
+        while time.monotonic() < self.window_end:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+            time.sleep(SAMPLE_INTERVAL)
+        self.finish(prefix)
+
+    def finish(self, prefix):
+        with self.lock:
+            mode, self.mode = self.mode, None
+            profiles, self.profiles = self.profiles, []
+            samples, self.samples = self.samples, Counter()
+            window_profile, self.window_profile = self.window_profile, None
+        if window_profile is not None:
+            window_profile.disable()
+            profiles.append(window_profile)
+        if mode == 'cprofile' and profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f"{prefix}.prof")
+        elif mode == 'sample':
+            with open(f"{prefix}.collapsed", 'w') as fp:
+                for stack, count in samples.most_common():
+                    fp.write(f"{stack} {count}\n")
+        with open(f"{prefix}.spans.json", 'w') as fp:
+            json.dump(self.span_stats(), fp, indent=1)
+
+
+class RequestProfile:
+    # cProfile satu request yang sudah diaktifkan oleh Profiler.request
+    def __init__(self, profiler, profile):
+        self.profiler = profiler
+        self.profile = profile
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        with self.profiler.lock:
+            if self.profiler.mode == 'cprofile':
+                self.profiler.profiles.append(self.profile)
+
+
+# satu profiler per proses, dikonfigurasi oleh main() setiap server
+profiler = Profiler()
+
+
+def add_profiling_arguments(parser):
+    parser.add_argument("--profile", action="store_true",
+                        help="aktifkan span, request PROFILE, dan sinyal SIGUSR1 (cprofile) / SIGUSR2 (sample)")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="direktori hasil profil (per proses: <jenis>-<pid>-<waktu>)")
+    parser.add_argument("--profile-window", type=float, default=PROFILE_WINDOW,
+                        help="lama window profil (detik) yang dimulai dengan sinyal")
+
+
+def profiling_options(args):
+    return dict(enabled=args.profile, directory=args.profile_dir, window=args.profile_window)
+
+
+def setup_profiling(**options):
+    # dipanggil main() sebelum FileProtocol dibuat (codec ikut dibungkus)
+    profiler.configure(**options)
@@ -1,8 +1,14 @@
+import os
+import re
 import json
 import logging
-import shlex
+import struct
 
-from file_interface import FileInterface
+from file_interface import FileInterface, CHUNK_SIZE, CACHE_BYTES, INDEX_POLL
+from file_storage import STORAGES
+from file_compression import CHUNKED, CHUNK_PREFIX
+from file_metrics import ServerMetrics
+from file_profiling import profiler, PROFILE_MODES
 
 """
 * class FileProtocol bertugas untuk memproses 
@@ -14,24 +20,303 @@ pada akhirnya akan diproses dalam bentuk string
 
 * class FileProtocol akan memproses data yang masuk dalam bentuk
 string
+
+* selain mode teks, tersedia mode biner (lihat PROTOKOL.txt): setiap
+pesan adalah frame berisi prefix tetap FRAME_HEADER, header JSON, lalu
+payload mentah (isi file) tanpa base64. Client memilih mode biner cukup
+dengan mengirim frame yang diawali FRAME_MAGIC; server membalas dengan
+mode yang sama sehingga client lama tetap dilayani dengan mode teks.
 """
 
+DELIMITER = b'\r\n\r\n'
+# satu token header request: "dikutip ganda", 'dikutip tunggal', atau tanpa spasi
+TOKEN = re.compile(r"""\s*(?:"([^"]*)"|'([^']*)'|(\S+))""")
+RECV_SIZE = 1024 * 1024
+
+FRAME_MAGIC = b'FBIN'
+# magic, panjang header JSON, panjang payload
+FRAME_HEADER = struct.Struct('!4sIQ')
+
+
+def frame_prefix(header, payload_len=0):
+    header_bytes = json.dumps(header).encode()
+    return FRAME_HEADER.pack(FRAME_MAGIC, len(header_bytes), payload_len) + header_bytes
+
+
+def payload_length(data):
+    # panjang payload untuk prefix frame; CHUNKED jika dikirim per potongan
+    return CHUNKED if getattr(data, 'chunked', False) else len(data)
+
+
+def parse_frame_prefix(data):
+    magic, header_len, payload_len = FRAME_HEADER.unpack(data[:FRAME_HEADER.size])
+    if magic != FRAME_MAGIC:
+        raise ValueError('frame tidak valid')
+    return header_len, payload_len
+
+
+def add_protocol_arguments(parser):
+    # opsi FileProtocol yang sama untuk semua varian server
+    parser.add_argument("--cache-mb", type=int, default=CACHE_BYTES // (1024 * 1024),
+                        help="batas memori cache isi file (per proses), 0 = mati")
+    parser.add_argument("--index-poll", type=float, default=INDEX_POLL,
+                        help="interval (detik) pemeriksaan perubahan direktori untuk index LIST, 0 = mati")
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="plain",
+                        help="cas: isi file disimpan per hash, upload duplikat tidak ditulis ulang")
+
+
+def protocol_options(args):
+    # argumen hasil add_protocol_arguments -> keyword untuk FileProtocol(...)
+    return dict(cache_bytes=args.cache_mb * 1024 * 1024, index_poll=args.index_poll, storage=args.storage)
+
+
+class MessageReader:
+    """
+    pembaca pesan dari socket yang dipakai bersama oleh server dan client.
+    Data ditampung di satu bytearray; delimiter hanya dicari pada bagian
+    yang baru diterima dan bagian yang sudah dipakai dibuang sesekali,
+    sehingga biaya membaca pesan sebanding dengan ukurannya (bukan
+    kuadratik seperti buffer += data lalu "delimiter in buffer")
+    """
+    def __init__(self, sock, data=b""):
+        self.sock = sock
+        self.buffer = bytearray(data)
+        self.pos = 0        # awal data yang belum dipakai
+        self.scanned = 0    # posisi awal pencarian delimiter berikutnya
+
+    def __len__(self):
+        return len(self.buffer) - self.pos
+
+    def fill(self, size=RECV_SIZE):
+        data = self.sock.recv(size)
+        if data:
+            if self.pos and self.pos >= len(self.buffer) - self.pos:
+                del self.buffer[:self.pos]
+                self.scanned -= self.pos
+                self.pos = 0
+            self.buffer += data
+        return len(data)
+
+    def startswith(self, prefix):
+        return self.buffer.startswith(prefix, self.pos)
+
+    def take(self, size):
+        # ambil paling banyak size byte yang sudah ada di buffer, tanpa recv
+        end = min(self.pos + size, len(self.buffer))
+        with memoryview(self.buffer)[self.pos:end] as view:
+            data = bytes(view)
+        self.pos = end
+        self.scanned = max(self.scanned, end)
+        return data
+
+    def read_until(self, delimiter=DELIMITER):
+        # satu pesan tanpa delimiter, atau None jika koneksi ditutup
+        while True:
+            idx = self.buffer.find(delimiter, max(self.pos, self.scanned))
+            if idx >= 0:
+                message = self.take(idx - self.pos)
+                self.pos = self.scanned = idx + len(delimiter)
+                return message
+            self.scanned = max(self.pos, len(self.buffer) - len(delimiter) + 1)
+            if not self.fill():
+                return None
+
+    def read_exact(self, size):
+        while len(self) < size:
+            if not self.fill():
+                raise ConnectionError('koneksi ditutup')
+        return self.take(size)
+
+    def read_some(self, size=RECV_SIZE):
+        # data di buffer dipakai dulu, selebihnya langsung dari socket
+        if len(self):
+            return self.take(size)
+        return self.sock.recv(size)
+
+    def read_into_file(self, fp, size, chunk_size=CHUNK_SIZE):
+        # payload besar ditulis langsung ke file dengan buffer tetap
+        if len(self):
+            data = self.take(size)
+            fp.write(data)
+            size -= len(data)
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while size > 0:
+            n = self.sock.recv_into(view, min(size, chunk_size))
+            if not n:
+                raise ConnectionError('koneksi ditutup')
+            fp.write(view[:n])
+            size -= n
+
+    def iter_payload(self, payload_len, chunk_size=CHUNK_SIZE):
+        # isi payload per potongan, baik payload biasa maupun CHUNKED
+        if payload_len == CHUNKED:
+            while True:
+                size, = CHUNK_PREFIX.unpack(self.read_exact(CHUNK_PREFIX.size))
+                if not size:
+                    return
+                yield self.read_exact(size)
+        while payload_len > 0:
+            if not len(self) and not self.fill(min(payload_len, RECV_SIZE)):
+                raise ConnectionError('koneksi ditutup')
+            data = self.take(min(payload_len, chunk_size))
+            payload_len -= len(data)
+            yield data
+
+    def read_payload(self, payload_len):
+        if payload_len == CHUNKED:
+            return b''.join(self.iter_payload(payload_len))
+        return self.read_exact(payload_len)
+
+    def read_frame_header(self):
+        while len(self) < len(FRAME_MAGIC):
+            if not self.fill():
+                raise ConnectionError('koneksi ditutup')
+        if not self.startswith(FRAME_MAGIC):
+            # balasan teks pada koneksi mode biner, mis. server sibuk yang
+            # menolak koneksi sebelum membaca request
+            message = self.read_until(DELIMITER)
+            if message is None:
+                raise ConnectionError('koneksi ditutup')
+            return json.loads(message), 0
+        header_len, payload_len = parse_frame_prefix(self.read_exact(FRAME_HEADER.size))
+        return json.loads(self.read_exact(header_len)), payload_len
+
+    def close(self):
+        self.sock.close()
+
 
 class FileProtocol:
-    def __init__(self):
-        self.file = FileInterface()
+    def __init__(self, **options):
+        # options diteruskan ke FileInterface (cache_bytes, index_poll, storage)
+        self.file = FileInterface(**options)
+        # dengan --profile setiap kerja codec tercatat sebagai span
+        self.file.codec = profiler.wrap_codec(self.file.codec)
+        # tabel request mode teks, dibuat sekali agar dispatch tidak
+        # memakai getattr (yang juga membuka akses ke method lain)
+        self.commands = dict(
+            list=self.file.list,
+            get=self.file.get,
+            upload=self.file.upload,
+            delete=self.file.delete,
+            stat=self.file.stat,
+            mget=self.file.mget,
+            mdelete=self.file.mdelete,
+            upload_init=self.file.upload_init,
+            upload_part=self.file.upload_part,
+            upload_commit=self.file.upload_commit,
+            upload_abort=self.file.upload_abort,
+            stats=self.stats,
+            profile=self.profile,
+        )
+        # request yang membawa isi file: jumlah parameter sebelum payload,
+        # sisa string setelahnya diteruskan utuh sebagai satu parameter
+        self.payload_params = dict(upload=1, upload_part=2)
+        # request mode biner yang memakai body/payload; request lain di
+        # self.commands dilayani dengan payload balasan kosong
+        self.frame_commands = dict(
+            get=self.frame_get,
+            upload=self.frame_upload,
+            upload_part=self.frame_upload_part,
+            mget=self.frame_mget,
+        )
+        # metrik per request dicatat oleh handler koneksi (lihat file_metrics);
+        # server menambah gauge miliknya sendiri (antrean executor, admission)
+        self.metrics = ServerMetrics(self.commands)
+        self.metrics.add_gauge('files', lambda: len(self.file.index.names))
+        self.metrics.add_gauge('storage', self.file.storage.stats)
+        self.metrics.add_gauge('codec', self.file.codec.stats)
+        if self.file.cache is not None:
+            self.metrics.add_gauge('cache', self.file.cache.stats)
+
+    def command_name(self, string_datamasuk):
+        # nama request untuk metrik tanpa menyalin payload
+        m = TOKEN.match(string_datamasuk)
+        return m.group(m.lastindex).lower() if m else ''
+
+    def span_name(self, c_request):
+        # nama request tak dikenal digabung agar jumlah span tetap terbatas
+        return f"command.{c_request if c_request in self.commands else 'other'}"
+
+    def stats(self, params=[]):
+        return dict(status='OK', data=self.metrics.snapshot())
+
+    def profile(self, params=[]):
+        # PROFILE: ringkasan span; PROFILE cprofile|sample [detik]: mulai
+        # window profil di proses ini (lihat file_profiling)
+        if not profiler.enabled:
+            return dict(status='ERROR', data='profiling tidak aktif (jalankan server dengan --profile)')
+        if not params:
+            return dict(status='OK', data=profiler.span_stats(), data_pid=os.getpid())
+        try:
+            if params[0] not in PROFILE_MODES:
+                return dict(status='ERROR', data=f"mode profil harus salah satu dari {', '.join(PROFILE_MODES)}")
+            seconds = float(params[1]) if len(params) > 1 else None
+            prefix = profiler.start_window(params[0], seconds)
+            return dict(status='OK', data=f"profil {params[0]} dimulai", data_prefix=prefix, data_pid=os.getpid())
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+
+    def parse_request(self, string_datamasuk):
+        # hanya header request yang ditokenisasi; payload (base64 UPLOAD)
+        # tidak dipindai dan tidak diubah huruf besar/kecilnya
+        m = TOKEN.match(string_datamasuk)
+        c_request = m.group(m.lastindex).lower()
+        n_params = self.payload_params.get(c_request)
+        params = []
+        pos = m.end()
+        while n_params is None or len(params) < n_params:
+            m = TOKEN.match(string_datamasuk, pos)
+            if m is None:
+                break
+            params.append(m.group(m.lastindex))
+            pos = m.end()
+        if n_params is not None:
+            payload = string_datamasuk[pos:].strip()
+            if payload:
+                params.append(payload)
+        return c_request, params
+
     def proses_string(self,string_datamasuk=''):
-        logging.warning(f"string diproses: {string_datamasuk}")
-        c = shlex.split(string_datamasuk.lower())
         try:
-            c_request = c[0].strip()
-            logging.warning(f"memproses request: {c_request}")
-            params = [x for x in c[1:]]
-            cl = getattr(self.file,c_request)(params)
-            return json.dumps(cl)
+            with profiler.request():
+                with profiler.span('parse'):
+                    c_request, params = self.parse_request(string_datamasuk)
+                logging.debug("memproses request: %s", c_request)
+                with profiler.span(self.span_name(c_request)):
+                    cl = self.commands[c_request](params)
+                with profiler.span('json'):
+                    return json.dumps(cl)
         except Exception:
             return json.dumps(dict(status='ERROR',data='request tidak dikenali'))
 
+    def frame_get(self, params, body, header):
+        return self.file.get_stream(params, encodings=header.get('accept_encoding', ()))
+
+    def frame_upload(self, params, body, header):
+        return self.file.upload_stream(params, body), b''
+
+    def frame_mget(self, params, body, header):
+        return self.file.mget_stream(params)
+
+    def frame_upload_part(self, params, body, header):
+        return self.file.upload_part_stream(params, body), b''
+
+    def proses_frame(self, header, body=None):
+        # header adalah dict hasil decode JSON dari frame biner, body adalah
+        # objek dengan method read(n) untuk membaca payload request secara
+        # bertahap; hasilnya pasangan (header balasan, payload balasan)
+        try:
+            c_request = header['command'].strip().lower()
+            logging.debug("memproses request biner: %s", c_request)
+            params = [str(x) for x in header.get('params', [])]
+            with profiler.request(), profiler.span(self.span_name(c_request)):
+                if c_request in self.frame_commands:
+                    return self.frame_commands[c_request](params, body, header)
+                return self.commands[c_request](params), b''
+        except Exception:
+            return dict(status='ERROR', data='request tidak dikenali'), b''
+
 
 if __name__=='__main__':
     #contoh pemakaian
@@ -2,12 +2,15 @@ from socket import *
 import socket
 import threading
 import logging
-import time
-import sys
+import argparse
 
 
 from file_protocol import  FileProtocol
-fp = FileProtocol()
+from file_handler import handle_client
+from file_logging import add_logging_arguments, setup_logging, logging_options
+from file_profiling import add_profiling_arguments, setup_profiling, profiling_options
+# dibuat di main() setelah opsi profiling dibaca
+fp = None
 
 
 class ProcessTheClient(threading.Thread):
@@ -17,30 +20,10 @@ class ProcessTheClient(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
-        rcv = ""
-        while True:
-            try:
-                data = self.connection.recv(32768)
-                if data:
-                    d = data.decode()
-                    rcv = rcv + d
-                    
-                    if len(data) < 32768:
-                        hasil = fp.proses_string(rcv)
-                        hasil = hasil+"\r\n\r\n"
-                        self.connection.sendall(hasil.encode())
-                        rcv = ""
-                        break
-                else:
-                    if rcv:
-                        hasil = fp.proses_string(rcv)
-                        hasil = hasil+"\r\n\r\n"
-                        self.connection.sendall(hasil.encode())
-                    break
-            except Exception as e:
-                logging.warning(f"Error processing client request: {str(e)}")
-                break
-        self.connection.close()
+        # pesan teks dibaca dengan MessageReader.read_until seperti server
+        # lain, jadi UPLOAD teks yang besar tidak lagi terpotong oleh recv
+        # yang kebetulan pendek; frame biner juga dilayani handler bersama
+        handle_client(fp, self.connection, self.address)
 
 
 class Server(threading.Thread):
@@ -57,7 +40,7 @@ class Server(threading.Thread):
         self.my_socket.listen(1)
         while True:
             self.connection, self.client_address = self.my_socket.accept()
-            logging.warning(f"connection from {self.client_address}")
+            logging.debug("connection from %s", self.client_address)
 
             clt = ProcessTheClient(self.connection, self.client_address)
             clt.start()
@@ -65,6 +48,14 @@ class Server(threading.Thread):
 
 
 def main():
+    global fp
+    parser = argparse.ArgumentParser()
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(**logging_options(args))
+    setup_profiling(**profiling_options(args))
+    fp = FileProtocol()
     svr = Server(ipaddress='0.0.0.0',port=7777)
     svr.start()
 
@@ -0,0 +1,226 @@
+import io
+import asyncio
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+from file_protocol import FileProtocol, add_protocol_arguments, protocol_options, DELIMITER, FRAME_MAGIC, FRAME_HEADER, frame_prefix, parse_frame_prefix, payload_length
+from file_handler import SEND_STRATEGIES, can_sendfile
+from file_interface import CHUNK_SIZE, MultiBody
+from file_metrics import CountingThreadPool, add_metrics_arguments, start_metrics_server
+from file_logging import add_logging_arguments, setup_logging, logging_options
+from file_profiling import add_profiling_arguments, setup_profiling, profiling_options
+from file_storage import prepare_storage
+
+# batas buffer StreamReader; di atas batas ini pembacaan socket ditahan
+# (backpressure) sampai data diproses
+READ_LIMIT = 1024 * 1024
+# payload request sampai batas ini ditampung di memori, di atasnya di
+# file sementara
+SPOOL_MEMORY = READ_LIMIT
+
+
+async def read_text_message(reader, data=b""):
+    # pesan teks bisa jauh lebih besar dari READ_LIMIT (UPLOAD base64),
+    # jadi diambil sepotong demi sepotong sampai delimiter ditemukan.
+    # data: byte awal yang sudah dibaca untuk memeriksa magic frame. Pesan
+    # pendek bisa berakhir di dalamnya ("\r\n\r\n", "LS\r\n\r\n"), jadi
+    # selama ujungnya masih bisa menjadi awal delimiter dibaca per byte
+    while not data.endswith(DELIMITER) and any(data.endswith(DELIMITER[:n]) for n in range(1, len(DELIMITER))):
+        data += await reader.readexactly(1)
+    if data.endswith(DELIMITER):
+        return data
+    parts = [data]
+    while True:
+        try:
+            parts.append(await reader.readuntil(DELIMITER))
+            return b"".join(parts)
+        except asyncio.LimitOverrunError as e:
+            parts.append(await reader.readexactly(e.consumed))
+
+
+class SpooledBody:
+    """
+    payload frame request yang sudah diterima seluruhnya oleh event loop
+    (di memori atau di file sementara), sehingga FileProtocol di thread
+    executor hanya membaca data lokal dan tidak pernah menunggu client
+    yang lambat mengirim
+    """
+    def __init__(self, fp, length):
+        self.fp = fp
+        self.remaining = length
+
+    def __len__(self):
+        return self.remaining
+
+    def read(self, size=CHUNK_SIZE):
+        if self.remaining <= 0:
+            return b""
+        chunk = self.fp.read(min(size, self.remaining))
+        self.remaining -= len(chunk)
+        return chunk
+
+    def close(self):
+        self.fp.close()
+
+
+async def spool_body(reader, loop, executor, length):
+    # payload kecil dibaca langsung ke memori; payload besar ditulis ke
+    # file sementara per CHUNK_SIZE, penulisan disk di executor berjalan
+    # sambil potongan berikutnya dibaca dari socket
+    if length <= SPOOL_MEMORY:
+        return SpooledBody(io.BytesIO(await reader.readexactly(length)), length)
+    fp = await loop.run_in_executor(executor, tempfile.TemporaryFile)
+    pending = None
+    try:
+        remaining = length
+        while remaining:
+            chunk = await reader.readexactly(min(CHUNK_SIZE, remaining))
+            remaining -= len(chunk)
+            if pending is not None:
+                await pending
+            pending = loop.run_in_executor(executor, fp.write, chunk)
+        await pending
+        await loop.run_in_executor(executor, fp.seek, 0)
+    except BaseException:
+        # penulisan yang masih berjalan di executor diselesaikan dulu
+        if pending is not None and not pending.done():
+            pending.add_done_callback(lambda _: fp.close())
+        else:
+            fp.close()
+        raise
+    return SpooledBody(fp, length)
+
+
+class Server:
+    def __init__(self, ipaddress="0.0.0.0", port=7779, pool_size=5, send_strategy="sendfile", protocol_options=None):
+        self.ipinfo = (ipaddress, port)
+        self.pool_size = pool_size
+        self.send_strategy = send_strategy
+        self.fp = FileProtocol(**(protocol_options or {}))
+        # executor hanya untuk kerja disk/CPU di FileProtocol, bukan untuk koneksi
+        self.executor = CountingThreadPool(max_workers=pool_size)
+        self.fp.metrics.add_gauge('executor_queue', self.executor.queue_size)
+
+    async def start(self):
+        server = await asyncio.start_server(self.handle_client, *self.ipinfo, limit=READ_LIMIT, backlog=1024)
+        logging.warning(f"Async server running at {self.ipinfo} with executor size {self.pool_size}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        client_address = writer.get_extra_info("peername")
+        logging.debug("Connection from %s", client_address)
+        loop = asyncio.get_running_loop()
+        self.fp.metrics.connection_opened()
+        try:
+            while True:
+                prefix = await reader.readexactly(len(FRAME_MAGIC))
+                if prefix == FRAME_MAGIC:
+                    await self.handle_frame(loop, reader, writer, prefix)
+                    continue
+                command_bytes = await read_text_message(reader, prefix)
+                started = time.perf_counter_ns()
+                command_str = command_bytes[:-4].decode()
+                logging.debug("[%s] Received: %.50s", client_address, command_str)
+                hasil = await loop.run_in_executor(self.executor, self.fp.proses_string, command_str)
+                response = (hasil + "\r\n\r\n").encode()
+                writer.write(response)
+                await writer.drain()
+                self.fp.metrics.record(self.fp.command_name(command_str), started, len(command_bytes), len(response),
+                                       not hasil.startswith('{"status": "ERROR"'))
+        except asyncio.IncompleteReadError:
+            pass
+        except Exception as e:
+            logging.error("Error handling client %s: %s", client_address, e)
+        finally:
+            self.fp.metrics.connection_closed()
+            writer.close()
+            logging.debug("Connection closed for %s", client_address)
+
+    async def handle_frame(self, loop, reader, writer, prefix):
+        prefix += await reader.readexactly(FRAME_HEADER.size - len(prefix))
+        header_len, payload_len = parse_frame_prefix(prefix)
+        header = json.loads(await reader.readexactly(header_len))
+        started = time.perf_counter_ns()
+        # payload upload diterima dulu di event loop; thread executor baru
+        # dipakai setelah semua data ada, jadi upload dari client lambat
+        # tidak menahan worker yang dibutuhkan perintah lain
+        body = await spool_body(reader, loop, self.executor, payload_len)
+        try:
+            hasil, data = await loop.run_in_executor(self.executor, self.fp.proses_frame, header, body)
+        finally:
+            body.close()
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            prefix = frame_prefix(hasil, len(data))
+            writer.write(prefix)
+            if data:
+                writer.write(data)
+            await writer.drain()
+            sent = len(prefix) + len(data)
+        else:
+            try:
+                prefix = frame_prefix(hasil, payload_length(data))
+                writer.write(prefix)
+                sent = len(prefix) + await self.send_body(loop, writer, data)
+            finally:
+                data.close()
+        self.fp.metrics.record(str(header.get('command', '')).lower(), started, payload_len, sent,
+                               hasil.get('status') == 'OK')
+
+    async def send_body(self, loop, writer, data):
+        # hasilnya jumlah byte payload yang terkirim
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            if data:
+                writer.write(data)
+                await writer.drain()
+            return len(data)
+        if isinstance(data, MultiBody):
+            sent = 0
+            for part in data.parts:
+                sent += await self.send_body(loop, writer, part)
+            return sent
+        if self.send_strategy == "sendfile" and can_sendfile(data):
+            await writer.drain()
+            return await loop.sendfile(writer.transport, data.fp, data.offset, len(data))
+        sent = 0
+        chunks = iter(data)
+        while True:
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            if chunk is None:
+                break
+            writer.write(chunk)
+            await writer.drain()
+            sent += len(chunk)
+        return sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pool_size", type=int, nargs="?", default=5)
+    parser.add_argument("--port", type=int, default=7779)
+    parser.add_argument("--send-strategy", choices=SEND_STRATEGIES, default="sendfile")
+    add_protocol_arguments(parser)
+    add_metrics_arguments(parser)
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(**logging_options(args))
+    setup_profiling(**profiling_options(args))
+    prepare_storage(args.storage)
+    server = Server(ipaddress="0.0.0.0", port=args.port, pool_size=args.pool_size, send_strategy=args.send_strategy,
+                    protocol_options=protocol_options(args))
+    start_metrics_server(server.fp.metrics, args.metrics_host, args.metrics_port)
+    try:
+        asyncio.run(server.start())
+    except KeyboardInterrupt:
+        logging.warning("KeyboardInterrupt received, shutting down server...")
+    finally:
+        server.executor.shutdown(wait=True)
+        logging.warning("Server has been shut down.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import asyncio
+import logging
+import argparse
+
+from file_protocol import add_protocol_arguments, protocol_options
+from file_handler import SEND_STRATEGIES, add_admission_arguments, timeout_options
+from file_codec import ProcessCodec, CODEC_MIN_BYTES
+from file_metrics import add_metrics_arguments, start_metrics_server
+from file_logging import add_logging_arguments, setup_logging, logging_options
+from file_profiling import add_profiling_arguments, setup_profiling, profiling_options
+from file_storage import prepare_storage
+import file_server_multithread_pool
+import file_server_async
+
+"""
+* mode hybrid: socket dan disk dilayani front end I/O, yaitu thread pool
+(file_server_multithread_pool, port 7778) atau asyncio
+(file_server_async, port 7779), sehingga jumlah koneksi tidak dibatasi
+jumlah proses. Hanya kerja CPU berat (base64, hash SHA-256, kompresi)
+yang dikirim ke process pool lewat shared memory (lihat file_codec),
+sehingga kerja tersebut tetap memakai banyak core
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pool_size", type=int, nargs="?", default=20,
+                        help="jumlah thread front end (thread: koneksi, async: executor)")
+    parser.add_argument("--frontend", choices=("thread", "async"), default="thread")
+    parser.add_argument("--port", type=int, help="default 7778 (thread) atau 7779 (async)")
+    parser.add_argument("--send-strategy", choices=SEND_STRATEGIES, default="sendfile")
+    parser.add_argument("--codec-workers", type=int, default=os.cpu_count(),
+                        help="jumlah proses untuk kerja CPU (base64, hash, kompresi)")
+    parser.add_argument("--codec-min-kb", type=int, default=CODEC_MIN_BYTES // 1024,
+                        help="data lebih kecil dari ini dikerjakan langsung di thread I/O")
+    add_protocol_arguments(parser)
+    add_admission_arguments(parser)
+    add_metrics_arguments(parser)
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    if args.frontend == "async":
+        # admission dan timeout hanya dipakai front end thread
+        ignored = [f"--{name.replace('_', '-')}" for name in ("max_inflight", "idle_timeout", "read_timeout")
+                   if getattr(args, name) != parser.get_default(name)]
+        if ignored:
+            parser.error(f"{', '.join(ignored)} hanya berlaku dengan --frontend thread")
+    setup_logging(**logging_options(args))
+    setup_profiling(**profiling_options(args))
+    prepare_storage(args.storage)
+
+    codec = ProcessCodec(args.codec_workers, args.codec_min_kb * 1024)
+    options = dict(protocol_options(args), codec=codec)
+    try:
+        if args.frontend == "thread":
+            server = file_server_multithread_pool.Server(
+                ipaddress="0.0.0.0", port=args.port or 7778, pool_size=args.pool_size, send_strategy=args.send_strategy,
+                protocol_options=options, max_inflight=args.max_inflight, **timeout_options(args))
+            start_metrics_server(server.fp.metrics, args.metrics_host, args.metrics_port)
+            server.start()
+        else:
+            server = file_server_async.Server(ipaddress="0.0.0.0", port=args.port or 7779, pool_size=args.pool_size,
+                                              send_strategy=args.send_strategy, protocol_options=options)
+            start_metrics_server(server.fp.metrics, args.metrics_host, args.metrics_port)
+            try:
+                asyncio.run(server.start())
+            except KeyboardInterrupt:
+                logging.warning("KeyboardInterrupt received, shutting down server...")
+            finally:
+                server.executor.shutdown(wait=True)
+    finally:
+        codec.close()
+        logging.warning(f"Codec stats: {codec.stats()}")
+
+
+if __name__ == "__main__":
+    main()
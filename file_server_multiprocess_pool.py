@@ -1,43 +1,62 @@
 from socket import *
+import os
 import socket
 import logging
-import time
-import sys
+import argparse
+import multiprocessing
 from concurrent.futures import ProcessPoolExecutor
 
-from file_protocol import FileProtocol
+from file_protocol import FileProtocol, add_protocol_arguments, protocol_options
+from file_handler import handle_client as serve_client, SEND_STRATEGIES, AdmissionController, add_admission_arguments, timeout_options
+from file_logging import add_logging_arguments, setup_logging, logging_options
+from file_profiling import add_profiling_arguments, setup_profiling, profiling_options
+from file_storage import prepare_storage
 
-def init_worker():
+def init_worker(options=None):
     global fp
-    fp = FileProtocol()
+    fp = FileProtocol(**(options or {}))
 
-def handle_client(connection, client_address):
-    buffer = ""
+def handle_client(connection, client_address, send_strategy="sendfile", timeouts=None):
+    serve_client(fp, connection, client_address, send_strategy=send_strategy, **(timeouts or {}))
+
+def listen_socket(ipinfo, reuseport=False):
+    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    my_socket.bind(ipinfo)
+    my_socket.listen(100)
+    return my_socket
+
+def prefork_worker(ipinfo, my_socket, send_strategy, options=None, timeouts=None):
+    # setiap worker menjalankan accept loop sendiri; tanpa socket dari
+    # parent (--reuseport), worker membuka socket SO_REUSEPORT sendiri dan
+    # kernel yang membagi koneksi masuk ke antar worker
+    init_worker(options)
+    if my_socket is None:
+        my_socket = listen_socket(ipinfo, reuseport=True)
     try:
         while True:
-            data = connection.recv(1024 * 1024)
-            if not data:
-                break
-            buffer += data.decode()
-            while "\r\n\r\n" in buffer:
-                command_str, buffer = buffer.split("\r\n\r\n", 1)
-                logging.warning(f"[{client_address}] Received: {command_str[:50]}...")
-                hasil = fp.proses_string(command_str)
-                response = hasil + "\r\n\r\n"
-                connection.sendall(response.encode())
-    except Exception as e:
-        logging.error(f"Error handling client {client_address}: {e}")
+            connection, client_address = my_socket.accept()
+            logging.debug("Connection from %s", client_address)
+            handle_client(connection, client_address, send_strategy, timeouts)
+    except KeyboardInterrupt:
+        pass
     finally:
-        connection.close()
-        logging.warning(f"Connection closed for {client_address}")
+        my_socket.close()
 
 class Server:
-    def __init__(self, ipaddress="0.0.0.0", port=7778, pool_size=5):
+    def __init__(self, ipaddress="0.0.0.0", port=7778, pool_size=5, send_strategy="sendfile", protocol_options=None,
+                 max_inflight=0, idle_timeout=None, read_timeout=None):
         self.ipinfo = (ipaddress, port)
         self.pool_size = pool_size
+        self.send_strategy = send_strategy
+        self.admission = AdmissionController(pool_size, max_inflight)
+        self.timeouts = dict(idle_timeout=idle_timeout, read_timeout=read_timeout)
         self.process_pool = ProcessPoolExecutor(
             max_workers=pool_size,
-            initializer=init_worker
+            initializer=init_worker,
+            initargs=(protocol_options,)
         )
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -45,6 +64,12 @@ class Server:
 
     def start(self):
         logging.warning(f"ProcessPool server running at {self.ipinfo} with pool size {self.pool_size}")
+        # dengan start method fork, ProcessPoolExecutor baru membuat semua
+        # worker pada submit pertama; jika itu terjadi setelah accept,
+        # setiap worker ikut mewarisi fd koneksi pertama dan client tersebut
+        # tidak pernah melihat koneksi tertutup. Worker dibuat sekarang,
+        # sebelum ada koneksi yang terbuka
+        self.process_pool.submit(os.getpid).result()
         self.my_socket.bind(self.ipinfo)
         self.my_socket.listen(100)
 
@@ -52,8 +77,15 @@ class Server:
             while self.running:
                 try:
                     connection, client_address = self.my_socket.accept()
-                    logging.warning(f"Connection from {client_address}")
-                    self.process_pool.submit(handle_client, connection, client_address)
+                    logging.debug("Connection from %s", client_address)
+                    if not self.admission.admit():
+                        self.admission.reject(connection, client_address)
+                        continue
+                    future = self.process_pool.submit(handle_client, connection, client_address, self.send_strategy, self.timeouts)
+                    future.add_done_callback(self.admission.release)
+                    # salinan socket di parent ditutup setelah worker selesai,
+                    # agar client melihat koneksi tertutup saat worker menutupnya
+                    future.add_done_callback(lambda _, connection=connection: connection.close())
                 except socket.timeout:
                     continue
         except KeyboardInterrupt:
@@ -65,12 +97,98 @@ class Server:
         self.running = False
         self.process_pool.shutdown(wait=True)
         self.my_socket.close()
+        logging.warning(f"Admission stats: {self.admission.stats()}")
+        logging.warning("Server has been shut down.")
+
+class PreforkServer:
+    """
+    mode pre-fork: pool_size proses worker dibuat di awal dan masing-masing
+    melakukan accept sendiri, sehingga koneksi tidak perlu di-pickle dan
+    dikirim lewat ProcessPoolExecutor dari satu proses parent. Worker hanya
+    accept saat tidak melayani koneksi, jadi antrean ada di backlog kernel
+    dan tidak bisa dihitung oleh admission control; max_inflight ditolak,
+    yang dibatasi di sini hanya idle/read timeout per koneksi
+
+    secara default semua worker berbagi satu socket listen milik parent,
+    sehingga koneksi baru diambil worker mana pun yang sedang bebas. Dengan
+    reuseport setiap worker punya socket (dan antrean accept) sendiri dan
+    kernel membagi koneksi per hash alamat tanpa melihat worker sibuk:
+    koneksi bisa menunggu di belakang koneksi keep-alive walaupun worker
+    lain menganggur
+    """
+    def __init__(self, ipaddress="0.0.0.0", port=7778, pool_size=5, send_strategy="sendfile", protocol_options=None,
+                 max_inflight=0, idle_timeout=None, read_timeout=None, reuseport=False):
+        if max_inflight:
+            raise ValueError("max_inflight tidak didukung pada mode prefork")
+        if reuseport and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("SO_REUSEPORT tidak didukung platform ini")
+        self.ipinfo = (ipaddress, port)
+        self.pool_size = pool_size
+        self.send_strategy = send_strategy
+        self.protocol_options = protocol_options
+        self.timeouts = dict(idle_timeout=idle_timeout, read_timeout=read_timeout)
+        self.reuseport = reuseport
+        self.workers = []
+
+    def start(self):
+        mode = "SO_REUSEPORT" if self.reuseport else "shared socket"
+        logging.warning(f"Prefork server running at {self.ipinfo} with {self.pool_size} workers ({mode})")
+        # tanpa reuseport semua worker berbagi satu socket listen milik parent
+        my_socket = None if self.reuseport else listen_socket(self.ipinfo)
+        for _ in range(self.pool_size):
+            worker = multiprocessing.Process(
+                target=prefork_worker,
+                args=(self.ipinfo, my_socket, self.send_strategy, self.protocol_options, self.timeouts),
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+        try:
+            for worker in self.workers:
+                worker.join()
+        except KeyboardInterrupt:
+            logging.warning("KeyboardInterrupt received, shutting down server...")
+        finally:
+            self.shutdown()
+            if my_socket is not None:
+                my_socket.close()
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.terminate()
+        for worker in self.workers:
+            worker.join()
         logging.warning("Server has been shut down.")
 
 def main():
-    pool_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5
-    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
-    server = Server(ipaddress="0.0.0.0", port=7778, pool_size=pool_size)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pool_size", type=int, nargs="?", default=5)
+    parser.add_argument("--port", type=int, default=7778)
+    parser.add_argument("--send-strategy", choices=SEND_STRATEGIES, default="sendfile")
+    parser.add_argument("--prefork", action="store_true", help="worker melakukan accept sendiri dari socket bersama")
+    parser.add_argument("--reuseport", action="store_true",
+                        help="(dengan --prefork) socket SO_REUSEPORT per worker; koneksi bisa antre di worker yang sibuk")
+    add_protocol_arguments(parser)
+    add_admission_arguments(parser)
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    if args.prefork and args.max_inflight:
+        parser.error("--max-inflight tidak didukung dengan --prefork (antrean koneksi ada di backlog kernel)")
+    if args.reuseport and not args.prefork:
+        parser.error("--reuseport hanya berlaku dengan --prefork")
+    if args.reuseport and not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("SO_REUSEPORT tidak didukung platform ini")
+    setup_logging(**logging_options(args))
+    setup_profiling(**profiling_options(args))
+    prepare_storage(args.storage)
+    options = dict(ipaddress="0.0.0.0", port=args.port, pool_size=args.pool_size, send_strategy=args.send_strategy,
+                   protocol_options=protocol_options(args), max_inflight=args.max_inflight, **timeout_options(args))
+    if args.prefork:
+        server = PreforkServer(reuseport=args.reuseport, **options)
+    else:
+        server = Server(**options)
     server.start()
 
 if __name__ == "__main__":
@@ -1,19 +1,27 @@
 from socket import *
 import socket
-import threading
 import logging
-import time
-import sys
-from concurrent.futures import ThreadPoolExecutor
+import argparse
 
-from file_protocol import FileProtocol
-fp = FileProtocol()
+from file_protocol import FileProtocol, add_protocol_arguments, protocol_options
+from file_handler import handle_client, SEND_STRATEGIES, AdmissionController, add_admission_arguments, timeout_options
+from file_metrics import CountingThreadPool, add_metrics_arguments, start_metrics_server
+from file_logging import add_logging_arguments, setup_logging, logging_options
+from file_profiling import add_profiling_arguments, setup_profiling, profiling_options
+from file_storage import prepare_storage
 
 class Server:
-    def __init__(self, ipaddress="0.0.0.0", port=7778, pool_size=5):
+    def __init__(self, ipaddress="0.0.0.0", port=7778, pool_size=5, send_strategy="sendfile", protocol_options=None,
+                 max_inflight=0, idle_timeout=None, read_timeout=None):
         self.ipinfo = (ipaddress, port)
         self.pool_size = pool_size
-        self.thread_pool = ThreadPoolExecutor(max_workers=pool_size)
+        self.send_strategy = send_strategy
+        self.admission = AdmissionController(pool_size, max_inflight)
+        self.timeouts = dict(idle_timeout=idle_timeout, read_timeout=read_timeout)
+        self.fp = FileProtocol(**(protocol_options or {}))
+        self.thread_pool = CountingThreadPool(max_workers=pool_size)
+        self.fp.metrics.add_gauge('admission', self.admission.stats)
+        self.fp.metrics.add_gauge('executor_queue', self.thread_pool.queue_size)
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.running = True
@@ -27,8 +35,12 @@ class Server:
             while self.running:
                 try:
                     connection, client_address = self.my_socket.accept()
-                    logging.warning(f"Connection from {client_address}")
-                    self.thread_pool.submit(self.handle_client, connection, client_address)
+                    logging.debug("Connection from %s", client_address)
+                    if not self.admission.admit():
+                        self.admission.reject(connection, client_address)
+                        continue
+                    future = self.thread_pool.submit(self.handle_client, connection, client_address)
+                    future.add_done_callback(self.admission.release)
                 except socket.timeout:
                     continue
         except KeyboardInterrupt:
@@ -37,35 +49,32 @@ class Server:
             self.shutdown()
 
     def handle_client(self, connection, client_address):
-        buffer = ""
-        try:
-            while True:
-                data = connection.recv(1024 * 1024)
-                if not data:
-                    break
-                buffer += data.decode()
-                while "\r\n\r\n" in buffer:
-                    command_str, buffer = buffer.split("\r\n\r\n", 1)
-                    logging.warning(f"[{client_address}] Received: {command_str[:50]}...")
-                    hasil = fp.proses_string(command_str)
-                    response = hasil + "\r\n\r\n"
-                    connection.sendall(response.encode())
-        except Exception as e:
-            logging.error(f"Error handling client {client_address}: {e}")
-        finally:
-            connection.close()
-            logging.warning(f"Connection closed for {client_address}")
+        handle_client(self.fp, connection, client_address, send_strategy=self.send_strategy, **self.timeouts)
 
     def shutdown(self):
         self.running = False
         self.thread_pool.shutdown(wait=True)
         self.my_socket.close()
+        logging.warning(f"Admission stats: {self.admission.stats()}")
         logging.warning("Server has been shut down.")
 
 def main():
-    pool_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5
-    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
-    server = Server(ipaddress="0.0.0.0", port=7778, pool_size=pool_size)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pool_size", type=int, nargs="?", default=5)
+    parser.add_argument("--port", type=int, default=7778)
+    parser.add_argument("--send-strategy", choices=SEND_STRATEGIES, default="sendfile")
+    add_protocol_arguments(parser)
+    add_admission_arguments(parser)
+    add_metrics_arguments(parser)
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(**logging_options(args))
+    setup_profiling(**profiling_options(args))
+    prepare_storage(args.storage)
+    server = Server(ipaddress="0.0.0.0", port=args.port, pool_size=args.pool_size, send_strategy=args.send_strategy,
+                    protocol_options=protocol_options(args), max_inflight=args.max_inflight, **timeout_options(args))
+    start_metrics_server(server.fp.metrics, args.metrics_host, args.metrics_port)
     server.start()
 
 if __name__ == "__main__":
@@ -0,0 +1,310 @@
+import os
+import uuid
+import hashlib
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+"""
+* penyimpanan isi file di bawah FileInterface. Semua backend bekerja di
+direktori kerja (files/) dan menyediakan:
+  - writer(nama)         : objek upload dengan write(data), commit(), abort()
+  - install_file(tmp, nama) : memasang file sementara yang sudah lengkap
+  - remove(nama)         : menghapus file
+  - digest(nama)         : hash SHA-256 yang sudah diketahui, atau None
+
+* "plain" menyimpan setiap file apa adanya (perilaku lama). "cas"
+menyimpan isi file sekali per hash SHA-256 di .cas/objects/ dan setiap
+nama file adalah symlink ke objeknya, sehingga upload dengan isi yang
+sudah ada tidak ditulis ulang ke disk. Jumlah nama yang merujuk setiap
+objek dicatat di file <objek>.refs, sehingga DELETE/overwrite tidak
+perlu memindai direktori
+
+* prepare_storage dipanggil sekali oleh proses utama server sebelum
+worker dibuat: objek yang tidak dirujuk dihapus dan semua refcount
+dihitung ulang dari symlink yang ada
+"""
+
+CHUNK_SIZE = 64 * 1024
+# upload mode cas ditampung di memori sampai sebesar ini; jika isinya
+# ternyata sudah ada, tidak ada satu byte pun yang ditulis ke disk. Upload
+# yang lebih besar tetap ditulis ke file sementara (memori per koneksi
+# tetap terbatas) dan file sementara itu dibuang jika isinya duplikat
+SPOOL_BYTES = 1024 * 1024
+
+
+def file_digest(filename):
+    hasher = hashlib.sha256()
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class FileUpload:
+    """
+    file hasil upload ditulis dulu ke file sementara di direktori yang
+    sama, lalu di-rename saat commit sehingga client lain tidak pernah
+    melihat file yang baru setengah tertulis
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        fd, self.tmpname = tempfile.mkstemp(dir='.', prefix='.upload-', suffix='.tmp')
+        self.fp = os.fdopen(fd, 'wb')
+        self.size = 0
+
+    def write(self, data):
+        self.fp.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        self.fp.close()
+        os.replace(self.tmpname, self.filename)
+
+    def abort(self):
+        self.fp.close()
+        if os.path.exists(self.tmpname):
+            os.remove(self.tmpname)
+
+
+class PlainStorage:
+    def writer(self, filename):
+        return FileUpload(filename)
+
+    def install_file(self, tmpname, filename):
+        os.replace(tmpname, filename)
+
+    def remove(self, filename):
+        os.remove(filename)
+
+    def digest(self, filename):
+        # backend plain tidak menyimpan hash
+        return None
+
+    def stats(self):
+        return dict(storage='plain')
+
+
+class ContentUpload:
+    """
+    upload untuk ContentStorage: hash dihitung sambil menerima data. Data
+    ditampung di memori sampai SPOOL_BYTES, selebihnya ditulis ke file
+    sementara; setiap upload punya tempat tampung sendiri sehingga writer
+    lain dengan nama yang sama tidak saling menimpa di tengah jalan
+    """
+    def __init__(self, filename, storage):
+        self.filename = filename
+        self.storage = storage
+        self.hasher = hashlib.sha256()
+        self.buffer = bytearray()
+        self.fp = None
+        self.tmpname = None
+        self.size = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.size += len(data)
+        if self.fp is None:
+            if len(self.buffer) + len(data) <= self.storage.spool_bytes:
+                self.buffer += data
+                return
+            fd, self.tmpname = tempfile.mkstemp(dir='.', prefix='.upload-', suffix='.tmp')
+            self.fp = os.fdopen(fd, 'wb')
+            self.fp.write(self.buffer)
+            self.buffer = bytearray()
+        self.fp.write(data)
+
+    def commit(self):
+        if self.fp is not None:
+            self.fp.close()
+        self.storage.install(self.filename, self.hasher.hexdigest(), self.tmpname, self.buffer)
+
+    def abort(self):
+        if self.fp is not None:
+            self.fp.close()
+        if self.tmpname and os.path.exists(self.tmpname):
+            os.remove(self.tmpname)
+
+
+class ContentStorage:
+    """
+    penyimpanan content-addressed: isi file disimpan di
+    .cas/objects/<2 hex>/<sha256> dan nama file adalah symlink relatif ke
+    objek tersebut (symlink itu sendiri menjadi metadata nama -> hash).
+    Pemasangan dan penghapusan objek dikunci dengan flock pada
+    .cas/lock sehingga aman dipakai bersama oleh banyak proses worker
+    """
+    def __init__(self, root='.cas', spool_bytes=SPOOL_BYTES):
+        self.root = root
+        self.objects = os.path.join(root, 'objects')
+        self.spool_bytes = spool_bytes
+        self.thread_lock = threading.Lock()
+        self.dedup_hits = 0
+        self.dedup_bytes = 0
+        os.makedirs(self.objects, exist_ok=True)
+        self.lock_fd = os.open(os.path.join(root, 'lock'), os.O_RDWR | os.O_CREAT, 0o644)
+
+    def close(self):
+        os.close(self.lock_fd)
+
+    def lock(self):
+        return StorageLock(self)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def digest(self, filename):
+        # hash isi file dari target symlink-nya, None jika bukan file cas
+        if not os.path.islink(filename):
+            return None
+        target = os.readlink(filename)
+        if os.path.basename(os.path.dirname(os.path.dirname(target))) != 'objects':
+            return None
+        return os.path.basename(target)
+
+    def writer(self, filename):
+        return ContentUpload(filename, self)
+
+    def install_file(self, tmpname, filename):
+        self.install(filename, file_digest(tmpname), tmpname)
+
+    def install(self, filename, digest, tmpname=None, data=b''):
+        # isi baru: file sementara di-rename menjadi objek (atau data di
+        # memori ditulis sekali). Isi yang sudah ada: tidak ada yang ditulis
+        obj = self.object_path(digest)
+        with self.lock():
+            old = self.digest(filename)
+            if os.path.exists(obj):
+                if tmpname:
+                    os.remove(tmpname)
+                self.dedup_hits += 1
+                self.dedup_bytes += os.path.getsize(obj)
+            else:
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                if tmpname is None:
+                    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(obj), prefix='.obj-')
+                    with os.fdopen(fd, 'wb') as fp:
+                        fp.write(data)
+                os.replace(tmpname, obj)
+            # symlink dibuat dengan nama sementara lalu di-rename agar
+            # pembaca selalu melihat file lama atau file baru secara utuh
+            link = f".link-{uuid.uuid4().hex}"
+            os.symlink(os.path.relpath(obj, os.path.dirname(filename) or '.'), link)
+            if old != digest:
+                self.add_ref(digest)
+            os.replace(link, filename)
+            # isi lama dari nama yang ditimpa tidak lagi dipakai
+            if old is not None and old != digest:
+                self.release(old)
+
+    def remove(self, filename):
+        with self.lock():
+            digest = self.digest(filename)
+            os.remove(filename)
+            if digest is not None:
+                self.release(digest)
+
+    def refs_path(self, digest):
+        return self.object_path(digest) + '.refs'
+
+    def refs(self, digest):
+        try:
+            with open(self.refs_path(digest)) as fp:
+                return int(fp.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def set_refs(self, digest, count):
+        # ditulis ke file sementara lalu di-rename agar tidak pernah terbaca
+        # setengah jadi; dipanggil dengan kunci storage dipegang
+        path = self.refs_path(digest)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as fp:
+            fp.write(str(count))
+        os.replace(tmp, path)
+
+    def add_ref(self, digest):
+        self.set_refs(digest, self.refs(digest) + 1)
+
+    def release(self, digest):
+        # kurangi refcount; objek dihapus jika tidak ada lagi nama yang
+        # merujuknya
+        count = self.refs(digest) - 1
+        if count > 0:
+            self.set_refs(digest, count)
+            return
+        for path in (self.object_path(digest), self.refs_path(digest)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def gc(self):
+        # refcount dihitung ulang dari symlink yang ada; objek yang tidak
+        # dirujuk (mis. proses mati di tengah DELETE) dan sisa file
+        # sementara dihapus. Memindai seluruh direktori, jadi hanya
+        # dijalankan saat start (lihat prepare_storage)
+        with self.lock():
+            used = {}
+            with os.scandir('.') as it:
+                for entry in it:
+                    if entry.is_symlink():
+                        digest = self.digest(entry.name)
+                        if digest is not None:
+                            used[digest] = used.get(digest, 0) + 1
+            for prefix in os.listdir(self.objects):
+                directory = os.path.join(self.objects, prefix)
+                for name in os.listdir(directory):
+                    if name.startswith('.') or name.endswith('.tmp'):
+                        os.remove(os.path.join(directory, name))
+                    elif name.endswith('.refs'):
+                        if name[:-len('.refs')] not in used:
+                            os.remove(os.path.join(directory, name))
+                    elif name in used:
+                        if self.refs(name) != used[name]:
+                            self.set_refs(name, used[name])
+                    else:
+                        os.remove(os.path.join(directory, name))
+
+    def stats(self):
+        return dict(storage='cas', dedup_hits=self.dedup_hits, dedup_bytes=self.dedup_bytes)
+
+
+class StorageLock:
+    # kunci antar thread (threading.Lock) dan antar proses (flock)
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __enter__(self):
+        self.storage.thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self.storage.lock_fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.storage.lock_fd, fcntl.LOCK_UN)
+        self.storage.thread_lock.release()
+
+
+STORAGES = dict(plain=PlainStorage, cas=ContentStorage)
+
+
+def prepare_storage(storage='plain', directory='files'):
+    # dipanggil sekali oleh main() server sebelum FileInterface dan proses
+    # worker dibuat, sehingga gc tidak berjalan di setiap worker
+    if storage != 'cas':
+        return
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        backend = ContentStorage()
+        try:
+            backend.gc()
+        finally:
+            backend.close()
+    finally:
+        os.chdir(cwd)
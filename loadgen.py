@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+
+from file_client import FileClient, ConnectionPool, clear_version
+from benchmark import SERVER_MODES, ServerProcess, latency_summary, metadata
+
+"""
+* load generator open-loop: request dikirim menurut jadwal dengan laju
+tetap (--arrival constant) atau acak Poisson (--arrival poisson) selama
+--duration detik, tidak menunggu balasan request sebelumnya. Berbeda
+dengan benchmark.py (closed-loop, setiap client baru mengirim setelah
+balasan datang), antrean di server ikut terlihat di latensi
+
+* latensi diukur dari waktu kirim yang dijadwalkan, bukan dari saat
+request benar-benar dikirim, sehingga request yang tertahan karena
+server (atau client) lambat tetap terhitung (coordinated omission).
+Waktu layanan (dari kirim sampai balasan) dicatat terpisah
+
+* campuran operasi diatur dengan --mix, mis. get_small=70,list=20,upload=10.
+File uji dibuat dari --seed di <workdir>/client lalu diupload ke server
+sebelum pengukuran, jadi bisa dipakai untuk server lokal (--server) atau
+server yang sudah berjalan (--host/--port)
+
+* --rates menyapu beberapa laju berurutan; laju dianggap jenuh jika laju
+yang tercapai kurang dari laju yang dijadwalkan (--tolerance) atau p99 melebihi
+--slo-ms, dan laju tertinggi yang belum jenuh dilaporkan sebagai titik
+saturasi. Request yang belum selesai --drain detik setelah jadwal habis
+dihitung gagal dengan latensi sampai saat itu (batas bawah); request yang
+sedang berjalan tetap ditunggu sampai selesai (dibatasi --timeout) dan
+dicatat sebagai terlambat, sehingga tidak ikut membebani laju berikutnya
+"""
+
+OPERATIONS = ('get_small', 'get_large', 'list', 'stat', 'upload')
+DEFAULT_MIX = 'get_small=70,list=20,upload=10'
+
+
+def parse_mix(text):
+    # "get_small=70,list=20" -> [('get_small', 70.0), ('list', 20.0)]
+    mix = []
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"operasi {name!r} tidak dikenal (pilihan: {', '.join(OPERATIONS)})")
+        try:
+            mix.append((name, float(weight or 1)))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bobot {weight!r} untuk {name} bukan angka")
+    if not mix or sum(w for _, w in mix) <= 0:
+        raise argparse.ArgumentTypeError("campuran operasi kosong")
+    return mix
+
+
+def make_schedule(rate, duration, arrival, mix, rng):
+    # list (detik sejak mulai, operasi) untuk satu generator
+    names, weights = zip(*mix)
+    times, t = [], 0.0
+    if arrival == 'poisson':
+        while True:
+            t += rng.expovariate(rate)
+            if t >= duration:
+                break
+            times.append(t)
+    else:
+        times = [i / rate for i in range(int(rate * duration))]
+    return list(zip(times, rng.choices(names, weights, k=len(times))))
+
+
+def prepare_files(client_dir, files, seed):
+    # file uji lokal: nama -> ukuran byte, isi ditentukan seed
+    os.makedirs(client_dir, exist_ok=True)
+    for name, size in files.items():
+        rng = random.Random(f"{seed}-{name}")
+        with open(os.path.join(client_dir, name), 'wb') as fp:
+            fp.write(rng.randbytes(size))
+
+
+class LoadGenerator:
+    """
+    satu generator open-loop di satu proses: thread dispatcher menunggu
+    setiap waktu terjadwal lalu menyerahkan request ke thread pool
+    berukuran `concurrency`. Jika semua thread sibuk request mengantre di
+    pool, dan waktu antre itu ikut masuk latensi
+    """
+    def __init__(self, ip, port, protocol, files, concurrency=32, keep_alive=False, timeout=30):
+        self.ip = ip
+        self.port = port
+        self.protocol = protocol
+        self.files = files
+        self.concurrency = concurrency
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.pool = ConnectionPool(max_idle=concurrency)
+        self.dests = set()
+
+    def client(self):
+        client = FileClient(self.ip, self.port, self.protocol, keep_alive=self.keep_alive, pool=self.pool)
+        client.timeout = self.timeout
+        return client
+
+    def operation(self, name):
+        # (sukses, byte data yang dipindahkan)
+        client = self.client()
+        if name in ('get_small', 'get_large'):
+            filename = self.files[name]
+            # tujuan per thread agar unduhan bersamaan tidak saling tindih
+            # (termasuk dengan file sumber di direktori client)
+            dest = f"{filename}.{threading.get_ident()}.part"
+            self.dests.add(dest)
+            if self.protocol == 'binary':
+                ok, _, size = client.remote_get_stream(filename, dest=dest)
+            else:
+                ok, _, size = client.remote_get_text(filename, dest=dest)
+            return ok, size
+        if name == 'list':
+            ok, _ = client.remote_list()
+            return ok, 0
+        if name == 'stat':
+            return client.remote_stat(self.files['get_small'])['status'] == 'OK', 0
+        ok, _, size = client.remote_upload(self.files['upload'])
+        return ok, size
+
+    def execute(self, name, intended):
+        started = time.perf_counter()
+        try:
+            ok, size = self.operation(name)
+        except Exception:
+            ok, size = False, 0
+        finished = time.perf_counter()
+        return name, ok, size, finished - intended, finished - started
+
+    def run(self, schedule, drain=10.0):
+        # hasilnya list (operasi, sukses, byte, latensi, waktu layanan,
+        # selesai, terlambat) dengan latensi dari waktu terjadwal; request
+        # yang belum selesai saat drain habis ditandai selesai=False, dan
+        # terlambat=True jika ia masih sempat selesai sebelum run kembali
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        base = time.perf_counter()
+        submitted = []
+        for offset, name in schedule:
+            intended = base + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            submitted.append((name, intended, executor.submit(self.execute, name, intended)))
+        wait([f for _, _, f in submitted], timeout=drain)
+        now = time.perf_counter()
+        pending = {f for _, _, f in submitted if not f.done()}
+        # request yang belum mulai dibatalkan, yang sedang berjalan ditunggu
+        # (dibatasi timeout socket client) agar tidak tumpang tindih dengan
+        # laju berikutnya
+        executor.shutdown(wait=True, cancel_futures=True)
+        samples = []
+        for name, intended, future in submitted:
+            if future not in pending:
+                samples.append(future.result() + (True, False))
+            else:
+                samples.append((name, False, 0, now - intended, 0.0, False, not future.cancelled()))
+        self.pool.close()
+        self.cleanup()
+        return samples, now - base
+
+    def cleanup(self):
+        # hasil unduhan (dan catatan resume jika unduhan terputus) dihapus
+        for dest in self.dests:
+            clear_version(dest)
+            try:
+                os.remove(dest)
+            except FileNotFoundError:
+                pass
+        self.dests.clear()
+
+
+def generator_worker(ip, port, protocol, files, concurrency, keep_alive, timeout, schedule, drain, client_dir):
+    # dijalankan di proses generator tersendiri (--processes > 1)
+    if os.getcwd() != client_dir:
+        os.chdir(client_dir)
+    generator = LoadGenerator(ip, port, protocol, files, concurrency, keep_alive, timeout)
+    return generator.run(schedule, drain)
+
+
+def summarize(samples, elapsed, rate, duration):
+    done = [s for s in samples if s[5]]
+    ok = [s for s in done if s[1]]
+    result = dict(
+        target_rate=rate, offered_rate=round(len(samples) / duration, 2), duration_s=duration,
+        elapsed_s=round(elapsed, 3), scheduled=len(samples),
+        completed=len(done), success=len(ok), fail=len(samples) - len(ok), unfinished=len(samples) - len(done),
+        late=sum(1 for s in samples if s[6]),
+        achieved_rate=round(len(ok) / elapsed, 2) if elapsed > 0 else 0,
+        throughput_mbps=round(sum(s[2] for s in ok) / elapsed / (1024 * 1024), 2) if elapsed > 0 else 0,
+        latency=latency_summary([s[3] for s in samples]),
+        service=latency_summary([s[4] for s in done]),
+        operations={},
+    )
+    for name in sorted({s[0] for s in samples}):
+        mine = [s for s in samples if s[0] == name]
+        result['operations'][name] = dict(count=len(mine), fail=sum(1 for s in mine if not s[1]),
+                                          **latency_summary([s[3] for s in mine]))
+    return result
+
+
+class LoadRunner:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = os.path.abspath(args.workdir)
+        self.client_dir = os.path.join(self.workdir, 'client')
+        self.files = dict(get_small='loadgen_small.bin', get_large='loadgen_large.bin', upload='loadgen_upload.bin')
+        self.sizes = {self.files['get_small']: args.small_kb * 1024, self.files['get_large']: args.large_mb * 1024 * 1024,
+                      self.files['upload']: args.upload_kb * 1024}
+        self.server = None
+
+    def run(self):
+        prepare_files(self.client_dir, self.sizes, self.args.seed)
+        os.chdir(self.client_dir)
+        if self.args.server:
+            os.makedirs(os.path.join(self.workdir, 'files'), exist_ok=True)
+            self.server = ServerProcess(self.args.server, self.args.server_workers, self.args.port, self.workdir,
+                                        self.args.server_args)
+            self.server.start()
+        try:
+            self.upload_targets()
+            results = []
+            for rate in self.args.rates:
+                result = self.step(rate)
+                results.append(result)
+                self.display(result)
+                if result['saturated'] and not self.args.keep_going:
+                    break
+                time.sleep(self.args.cooldown)
+            return results
+        finally:
+            if self.server is not None:
+                self.server.stop()
+            # file uji lokal dibuat ulang dari seed setiap run
+            for name in self.sizes:
+                try:
+                    os.remove(os.path.join(self.client_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def upload_targets(self):
+        # file GET harus ada di server sebelum pengukuran
+        client = FileClient(self.args.host, self.args.port, self.args.protocol)
+        for name in (self.files['get_small'], self.files['get_large']):
+            ok, _, _ = client.remote_upload(name)
+            if not ok:
+                raise RuntimeError(f"gagal mengupload {name} ke {self.args.host}:{self.args.port}")
+
+    def step(self, rate):
+        args = self.args
+        processes = max(1, min(args.processes, int(rate)))
+        concurrency = max(1, args.concurrency // processes)
+        rng = random.Random(f"{args.seed}-{rate}")
+        schedules = [make_schedule(rate / processes, args.duration, args.arrival, args.mix, rng)
+                     for _ in range(processes)]
+        usage_before = self.server.usage() if self.server else None
+
+        worker_args = (args.host, args.port, args.protocol, self.files, concurrency, args.keep_alive,
+                       args.timeout)
+        if processes == 1:
+            samples, elapsed = generator_worker(*worker_args, schedules[0], args.drain, self.client_dir)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(generator_worker, *worker_args, schedule, args.drain, self.client_dir)
+                           for schedule in schedules]
+                outcomes = [f.result() for f in futures]
+            samples = [s for part, _ in outcomes for s in part]
+            elapsed = max(e for _, e in outcomes)
+
+        result = summarize(samples, elapsed, rate, args.duration)
+        result.update(arrival=args.arrival, protocol=args.protocol, generators=processes)
+        usage_after = self.server.usage() if self.server else None
+        if usage_before is not None and usage_after is not None:
+            result.update(server_cpu_s=round(usage_after[0] - usage_before[0], 2),
+                          server_rss_mb=round(usage_after[1] / 1024, 1))
+        # dibandingkan dengan laju yang benar-benar dijadwalkan (Poisson
+        # tidak tepat sama dengan target)
+        result['saturated'] = (result['achieved_rate'] < result['offered_rate'] * (1 - args.tolerance) or
+                               result['latency']['p99_ms'] > args.slo_ms)
+        return result
+
+    def display(self, r):
+        mark = "  JENUH" if r['saturated'] else ""
+        print(f"target {r['target_rate']:>8.1f}/s  tercapai {r['achieved_rate']:>8.1f}/s  "
+              f"ok {r['success']}/{r['scheduled']} (belum selesai {r['unfinished']}, terlambat {r['late']})  "
+              f"latensi p50 {r['latency']['p50_ms']:>8.1f} p99 {r['latency']['p99_ms']:>8.1f} ms  "
+              f"layanan p99 {r['service']['p99_ms']:>8.1f} ms{mark}")
+
+
+def saturation_point(results):
+    # laju tertinggi yang belum jenuh
+    rates = [r['target_rate'] for r in results if not r['saturated']]
+    return max(rates) if rates else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator open-loop dengan laju request tertentu")
+    parser.add_argument("--rates", nargs="+", type=float, default=[50, 100, 200, 400],
+                        help="laju target (request/detik), dicoba berurutan")
+    parser.add_argument("--duration", type=float, default=10.0, help="lama setiap laju (detik)")
+    parser.add_argument("--arrival", choices=["constant", "poisson"], default="poisson")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"campuran operasi berbobot, operasi: {', '.join(OPERATIONS)} (default {DEFAULT_MIX})")
+    parser.add_argument("--protocol", choices=["text", "binary"], default="binary")
+    parser.add_argument("--small-kb", type=int, default=16, help="ukuran file get_small/stat")
+    parser.add_argument("--large-mb", type=int, default=10, help="ukuran file get_large")
+    parser.add_argument("--upload-kb", type=int, default=256, help="ukuran file upload")
+    parser.add_argument("--concurrency", type=int, default=64, help="maksimal request bersamaan (semua generator)")
+    parser.add_argument("--processes", type=int, default=1, help="jumlah proses generator, laju dibagi rata")
+    parser.add_argument("--keep-alive", action="store_true",
+                        help="pakai ulang koneksi; pada server pool, koneksi idle tetap memegang worker")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout socket per request (detik)")
+    parser.add_argument("--drain", type=float, default=10.0,
+                        help="waktu tunggu request tersisa setelah jadwal habis (detik)")
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="batas p99 sebelum laju dianggap jenuh")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="laju tercapai boleh kurang dari target sebesar ini sebelum dianggap jenuh")
+    parser.add_argument("--keep-going", action="store_true", help="lanjutkan sapuan setelah laju jenuh")
+    parser.add_argument("--cooldown", type=float, default=1.0, help="jeda antar laju (detik)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7790)
+    parser.add_argument("--server", choices=sorted(SERVER_MODES),
+                        help="jalankan server lokal mode ini (tanpa opsi ini server di --host/--port dipakai)")
+    parser.add_argument("--server-workers", type=int, default=5)
+    parser.add_argument("--workdir", default="loadgen-work", help="direktori data uji (dan files/ server lokal)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-args", nargs=argparse.REMAINDER, default=[],
+                        help="argumen tambahan untuk server lokal, harus di akhir")
+    parser.add_argument("--output", default="loadgen_results.json")
+    args = parser.parse_args()
+    # generator berpindah ke direktori client, path hasil dibuat absolut dulu
+    args.output = os.path.abspath(args.output)
+
+    results = LoadRunner(args).run()
+    saturation = saturation_point(results)
+    info = metadata(args)
+    with open(args.output, 'w') as fp:
+        json.dump(dict(metadata=info, saturation_rate=saturation, results=results), fp, indent=1)
+    print(f"\nTitik saturasi: {f'{saturation:g} request/detik' if saturation is not None else 'di bawah laju terendah'}")
+    print(f"Hasil ditulis ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()